@@ -1,22 +1,81 @@
+import os
 from flask import Flask
 from flask_migrate import Migrate
 from extensions import db
-from routes import home, tasks, history, parent
+import app_logging
+import database
+import events
+import instrumentation
+import page_cache
+import question_store
+import problem_cache
+import problem_generator
+import singleflight
+from commands import register_commands
+from routes import home, tasks, history, parent, api, live, export
 from routes.ai_problems import ai_problems_bp
 
 migrate = Migrate(db)
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.secret_key = 'your_secret_key'
 
-    # SQLite database configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///task_tracker.db'
+    # Database configuration: SQLite file by default, DATABASE_URL for anything else
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', database.DEFAULT_DATABASE_URI)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Question store backend: "sql" (question_sets table) or "jsonl" (append-only file)
+    app.config['QUESTION_STORE'] = os.environ.get('QUESTION_STORE', 'sql')
+    # Number of (user, difficulty, date) problem sets kept in memory per process
+    app.config['AI_PROBLEM_CACHE_SIZE'] = int(os.environ.get('AI_PROBLEM_CACHE_SIZE', 256))
+    # Background generation: worker threads for model calls, started with the first job
+    app.config['AI_GENERATION_WORKERS'] = int(os.environ.get('AI_GENERATION_WORKERS', 2))
+    # Daily prefetch thread of the development server; gunicorn deployments run `flask prefetch-problems` from cron
+    app.config['AI_PREFETCH_ENABLED'] = os.environ.get('AI_PREFETCH_ENABLED', '1') == '1'
+    # Deduplicate concurrent generations: "file" also covers several workers on one host, "thread" one process
+    app.config['AI_SINGLE_FLIGHT'] = os.environ.get('AI_SINGLE_FLIGHT', 'file')
+    # Live task updates: "socket" relays events between worker processes on one host, "none" keeps them in-process
+    app.config['EVENTS_RELAY'] = os.environ.get('EVENTS_RELAY', 'socket')
+    # Seconds before an /events stream ends and the browser reconnects, so open tabs do not pin server threads
+    app.config['EVENTS_MAX_STREAM_SECONDS'] = int(os.environ.get('EVENTS_MAX_STREAM_SECONDS', 300))
+    # Per-request timing, SQL and OpenAI metrics: Server-Timing header and /metrics
+    app.config['INSTRUMENTATION_ENABLED'] = os.environ.get('INSTRUMENTATION_ENABLED', '1') == '1'
+    # JSON line logs written by a background thread; "{pid}" in LOG_FILE gives each worker its own file
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_FILE'] = os.environ.get('LOG_FILE', app_logging.DEFAULT_LOG_FILE)
+    app.config['LOG_MAX_BYTES'] = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['LOG_BACKUP_COUNT'] = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    app.config['LOG_STDERR'] = os.environ.get('LOG_STDERR', '0') == '1'
+    # Fraction of requests whose info/debug lines are kept; warnings and errors always are
+    app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+    app.config['LOG_REQUESTS'] = os.environ.get('LOG_REQUESTS', '1') == '1'
+    # Rendered page cache: "memory" (per process), "disk" (shared by the workers of a host) or "none"
+    app.config['PAGE_CACHE'] = os.environ.get('PAGE_CACHE', 'memory')
+    app.config['PAGE_CACHE_SIZE'] = int(os.environ.get('PAGE_CACHE_SIZE', 512))
+    app.config['PAGE_CACHE_DIR'] = os.environ.get('PAGE_CACHE_DIR', page_cache.PAGE_CACHE_DIR)
+    app.config['PAGE_CACHE_MAX_BYTES'] = int(os.environ.get('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Overrides for scripts and benchmarks, e.g. an in-memory database
+    if config:
+        app.config.update(config)
+
+    # Pool sizing and SQLite pragmas for the final URI (DB_PROFILE=plain turns them off)
+    database.configure_database(app)
+
     # Initialize extensions
     db.init_app(app)
+    database.init_app(app)
+    instrumentation.init_app(app)
+    app_logging.init_app(app)
     migrate.init_app(app, db)
+    question_store.init_app(app)
+    problem_cache.init_app(app)
+    page_cache.init_app(app)
+    singleflight.init_app(app)
+    events.init_app(app)
+    problem_generator.init_app(app)
+    register_commands(app)
 
     # Register blueprints
     app.register_blueprint(home)
@@ -24,12 +83,20 @@ def create_app():
     app.register_blueprint(history)
     app.register_blueprint(parent)
     app.register_blueprint(ai_problems_bp)
+    app.register_blueprint(api)
+    app.register_blueprint(live)
+    app.register_blueprint(export)
 
-    with app.app_context():
-        db.create_all()  # Create tables if they don't exist
+    # Create tables if they don't exist; skipped when the database is at the migration head
+    database.ensure_schema(app)
+    # Random id of this database, part of the page cache keys
+    database.load_database_id(app)
 
     return app
 
 if __name__ == '__main__':
     app = create_app()
+    # The reloader runs the app in a child process; prefetch there only
+    if app.config['AI_PREFETCH_ENABLED'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        app.extensions['problem_generator'].start_prefetch()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
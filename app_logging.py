@@ -0,0 +1,192 @@
+"""
+Structured, non-blocking logging.
+Records are put on an in-memory queue by a QueueHandler on the root logger, and a
+QueueListener thread writes them as JSON lines to a size-rotated file (and stderr
+if enabled), so request threads never wait on disk or terminal I/O. Each record
+carries the request id (X-Request-ID, or a generated one echoed back on the
+response) and the session user id. Every request also gets one "request" record
+with its status and timings.
+
+Info and debug records can be sampled with LOG_SAMPLE_RATE: the decision is made
+once per request, so a sampled request keeps all of its lines. Warnings and errors
+are always written.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request, session
+
+from instrumentation import request_stats
+
+DEFAULT_LOG_FILE = os.path.join(os.path.dirname(__file__), 'logs', 'app.log')
+
+# Attributes every LogRecord has; anything else was passed with extra= and is written as a field
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line.
+    """
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that stamps records with the request context before they leave the
+    request thread, and keeps tracebacks as text instead of merging them into the message.
+    """
+    def __init__(self, log_queue, sample_rate=1.0):
+        super().__init__(log_queue)
+        self.sample_rate = sample_rate
+
+    def sampled(self):
+        if self.sample_rate >= 1:
+            return True
+        if has_request_context():
+            if 'log_sampled' not in g:
+                g.log_sampled = random.random() < self.sample_rate
+            return g.log_sampled
+        return random.random() < self.sample_rate
+
+    def emit(self, record):
+        if record.levelno < logging.WARNING and not self.sampled():
+            return
+        super().emit(record)
+
+    def prepare(self, record):
+        if has_request_context():
+            if not hasattr(record, 'request_id'):
+                record.request_id = g.get('request_id')
+            if not hasattr(record, 'user_id'):
+                record.user_id = session.get('user_id')
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+def build_handlers(app):
+    """
+    Returns the handlers the listener thread writes to.
+    """
+    formatter = JsonFormatter()
+    handlers = []
+    log_file = app.config.get('LOG_FILE', DEFAULT_LOG_FILE)
+    if log_file:
+        # {pid} gives each worker process its own file, so rotation never races between processes
+        log_file = log_file.replace('{pid}', str(os.getpid()))
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('LOG_BACKUP_COUNT', 5),
+            encoding='utf-8'
+        ))
+    if app.config.get('LOG_STDERR', False) or not handlers:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def stop_logging():
+    """
+    Flushes queued records and stops the listener thread.
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def start_logging(app):
+    """
+    Routes the root logger through the queue to the configured handlers.
+    Calling it again (another create_app in the same process) replaces the previous setup.
+    """
+    global _listener, _queue_handler
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    _queue_handler = ContextQueueHandler(log_queue, app.config.get('LOG_SAMPLE_RATE', 1.0))
+    _listener = logging.handlers.QueueListener(log_queue, *build_handlers(app), respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    # Werkzeug writes its own access lines; ours carry the request id and timings
+    if app.config.get('LOG_REQUESTS', True):
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+def init_app(app):
+    """
+    Starts the logging listener and logs one record per request.
+    """
+    start_logging(app)
+    app.extensions['logging'] = _listener
+    access_log = logging.getLogger('task_tracker.request')
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id is None:
+            return response
+        response.headers['X-Request-ID'] = request_id
+        if not app.config.get('LOG_REQUESTS', True):
+            return response
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2)
+        }
+        stats = request_stats()
+        if stats is not None:
+            fields.update({
+                'sql_queries': stats.sql_count,
+                'sql_ms': round(stats.sql_seconds * 1000, 2),
+                'io_ms': round(stats.io_seconds * 1000, 2),
+                'openai_ms': round(stats.openai_seconds * 1000, 2)
+            })
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        access_log.log(level, "%s %s %s", request.method, request.path, response.status_code, extra=fields)
+        return response
+
+atexit.register(stop_logging)
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for routes.tasks.load_tasks_for_user.
+Seeds an in-memory database with one user owning many tasks and today's logs, then
+compares the joined implementation with the previous per-task log scan.
+
+Usage: python benchmarks/bench_load_tasks.py [--tasks 2000] [--repeat 20]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, time as Time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import Parent, User, Task, TaskLog
+from routes.tasks import load_tasks_for_user
+from timezone_utils import now_pst, get_pst_weekday
+
+WEEKDAY_SETS = ["daily", "Mon, Wed, Fri", "Tue,Thu", "Sat, Sun", "Mon,Tue,Wed,Thu,Fri,Sat,Sun"]
+
+def load_tasks_for_user_scan(user_id):
+    """The previous implementation: one log scan and one frequency split per task."""
+    today = now_pst()
+    today_date = today.date()
+    today_weekday = get_pst_weekday(today)
+    tasks = Task.query.filter_by(user_id=user_id).all()
+    task_logs = TaskLog.query.filter_by(user_id=user_id, date=today_date).all()
+    task_list = []
+    for task in tasks:
+        if task.frequency.lower() == "daily" or today_weekday in [day.strip().capitalize() for day in task.frequency.split(",")]:
+            log = next((log for log in task_logs if log.task == task.task), None)
+            task_list.append({
+                "id": task.id,
+                "task": task.task,
+                "status": log.status if log else "TODO",
+                "frequency": task.frequency,
+                "duration": task.duration if task.duration is not None else "as needed",
+                "time": log.time_str if log and log.status == "Done" else None,
+                "log_completed_page_numbers": task.log_completed_page_numbers
+            })
+    return task_list
+
+def seed(num_tasks):
+    parent = Parent(name="Bench")
+    db.session.add(parent)
+    db.session.flush()
+    user = User(name="Bench Kid", dob=date(2016, 1, 1), ai_difficulty=10, parent_id=parent.id)
+    db.session.add(user)
+    db.session.flush()
+    today = now_pst().date()
+    db.session.execute(db.insert(Task), [
+        {"user_id": user.id, "task": f"Task {i}", "frequency": WEEKDAY_SETS[i % len(WEEKDAY_SETS)], "duration": 10}
+        for i in range(num_tasks)
+    ])
+    task_ids = db.session.scalars(db.select(Task.id).filter_by(user_id=user.id).order_by(Task.id)).all()
+    db.session.execute(db.insert(TaskLog), [
+        {"user_id": user.id, "task_id": task_ids[i], "task": f"Task {i}", "date": today, "status": "Done", "time": Time(8, 0)}
+        for i in range(0, num_tasks, 2)
+    ])
+    db.session.commit()
+    return user.id
+
+def best_of(fn, user_id, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        fn(user_id)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    # Keep lock files and logs out of the checkout
+    workdir = tempfile.mkdtemp(prefix='task_tracker_load_tasks_')
+    try:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'AI_PREFETCH_ENABLED': False,
+            'AI_SINGLE_FLIGHT': 'thread',
+            'EVENTS_RELAY': 'none',
+            'LOG_FILE': os.path.join(workdir, 'app.log')
+        })
+        with app.app_context():
+            user_id = seed(args.tasks)
+            assert load_tasks_for_user(user_id) == load_tasks_for_user_scan(user_id)
+            joined = best_of(load_tasks_for_user, user_id, args.repeat)
+            scan = best_of(load_tasks_for_user_scan, user_id, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"{args.tasks} tasks: joined {joined * 1000:.1f} ms, per-task scan {scan * 1000:.1f} ms ({scan / joined:.1f}x)")
+
+if __name__ == '__main__':
+    main()
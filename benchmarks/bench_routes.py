@@ -0,0 +1,247 @@
+"""
+Benchmark of the hot routes on a throwaway SQLite database.
+Seeds synthetic parents, children, tasks, days of logs and a questions log, then
+drives /tasks, /history, /ai_problems/ and log_task_status (through the status API)
+with the Flask test client. Reports latency percentiles and SQL queries per request,
+and saves the results as JSON so runs can be compared.
+
+Usage: python benchmarks/bench_routes.py [--children 3] [--days 365] [--requests 200]
+           [--output results.json] [--baseline previous.json --max-regression 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from sqlalchemy import event
+
+import openai_helper
+from app import create_app
+from extensions import db
+from openai_stub import make_stub_client
+from problem_cache import get_problem_cache
+from seed import seed_database
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class QueryCounter:
+    """
+    Counts SQL statements on the app's engine between resets.
+    """
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+    def take(self):
+        count, self.count = self.count, 0
+        return count
+
+def login(client, user):
+    with client.session_transaction() as session:
+        session['user_id'] = user['id']
+        session['user'] = user['name']
+
+def build_scenarios(app, users, rng):
+    """
+    Returns {name: callable(client) -> response}; each callable logs in as a random child first.
+    """
+    toggles = {}
+
+    def pick(client):
+        user = rng.choice(users)
+        login(client, user)
+        return user
+
+    def tasks_page(client):
+        pick(client)
+        return client.get('/tasks')
+
+    def history_page(client):
+        pick(client)
+        return client.get('/history')
+
+    def ai_problems_page(client):
+        pick(client)
+        return client.get('/ai_problems/')
+
+    def ai_problems_cold(client):
+        # Cache cleared so the set comes from the question store
+        pick(client)
+        with app.app_context():
+            get_problem_cache().clear()
+        return client.get('/ai_problems/')
+
+    def log_task_status(client):
+        user = pick(client)
+        task_id = rng.choice(user['task_ids'])
+        status = toggles[task_id] = 'TODO' if toggles.get(task_id) == 'Done' else 'Done'
+        return client.patch(f"/api/users/{user['id']}/tasks/{task_id}/status", json={'status': status})
+
+    return {
+        'tasks': tasks_page,
+        'history': history_page,
+        'ai_problems': ai_problems_page,
+        'ai_problems_cold': ai_problems_cold,
+        'log_task_status': log_task_status,
+    }
+
+def run_scenario(scenario, client, counter, requests, warmup):
+    for _ in range(warmup):
+        scenario(client)
+    latencies, queries, errors = [], [], 0
+    for _ in range(requests):
+        counter.take()
+        start = time.perf_counter()
+        response = scenario(client)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.take())
+        if response.status_code >= 400:
+            errors += 1
+    latencies.sort()
+    result = {f"p{pct}_ms": round(percentile(latencies, pct), 3) for pct in PERCENTILES}
+    result.update({
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'min_ms': round(latencies[0], 3),
+        'max_ms': round(latencies[-1], 3),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'requests': requests,
+        'errors': errors
+    })
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, max_regression):
+    """
+    Prints the p50/p95 change against a previous results file.
+    Returns:
+        list: Names of routes whose p50 regressed by more than max_regression.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('revision') or 'unknown revision'}):")
+    for name, current in results['routes'].items():
+        previous = baseline['routes'].get(name)
+        if not previous:
+            continue
+        changes = []
+        for key in ('p50_ms', 'p95_ms', 'queries_mean'):
+            if previous[key]:
+                changes.append(f"{key} {(current[key] - previous[key]) / previous[key]:+.0%}")
+        print(f"  {name:18} {', '.join(changes)}")
+        if previous['p50_ms'] and current['p50_ms'] > previous['p50_ms'] * (1 + max_regression):
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--parents', type=int, default=2)
+    parser.add_argument('--children', type=int, default=3, help='Children per parent.')
+    parser.add_argument('--tasks', type=int, default=20, help='Tasks per child.')
+    parser.add_argument('--days', type=int, default=365, help='Days of task logs per child.')
+    parser.add_argument('--questions', type=int, default=1000, help='Entries in the questions log.')
+    parser.add_argument('--question-store', choices=['sql', 'jsonl'], default='sql')
+    parser.add_argument('--page-cache', choices=['memory', 'disk', 'none'], default='memory',
+                        help='Rendered page cache; "none" measures the uncached pages.')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per route.')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--routes', nargs='*', help='Only run these routes.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json).')
+    parser.add_argument('--baseline', help='Previous results file to compare with.')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Fail when a p50 is this fraction slower than the baseline.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='task_tracker_bench_')
+    try:
+        openai_helper.client = make_stub_client()
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+            'QUESTION_STORE': args.question_store,
+            'QUESTION_STORE_PATH': os.path.join(workdir, 'questions_log.jsonl'),
+            'PAGE_CACHE': args.page_cache,
+            'PAGE_CACHE_DIR': os.path.join(workdir, 'page_cache'),
+            'AI_PREFETCH_ENABLED': False,
+            'AI_SINGLE_FLIGHT': 'thread',
+            'EVENTS_RELAY': 'none',
+            'LOG_FILE': os.path.join(workdir, 'app.log'),
+            'TESTING': True
+        })
+
+        started = time.perf_counter()
+        with app.app_context():
+            seeded = seed_database(args.parents, args.children, args.tasks, args.days, args.questions, args.seed)
+            counter = QueryCounter(db.engine)
+        print(f"Seeded {len(seeded['users'])} children, {seeded['counts']['task_logs']} logs, "
+              f"{seeded['counts']['question_sets']} question sets in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(args.seed)
+        scenarios = build_scenarios(app, seeded['users'], rng)
+        client = app.test_client()
+        results = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'scale': {key: getattr(args, key) for key in ('parents', 'children', 'tasks', 'days', 'questions', 'question_store', 'page_cache')},
+                'requests': args.requests
+            },
+            'routes': {}
+        }
+        for name, scenario in scenarios.items():
+            if args.routes and name not in args.routes:
+                continue
+            result = results['routes'][name] = run_scenario(scenario, client, counter, args.requests, args.warmup)
+            print(f"{name:18} p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+                  f"p99 {result['p99_ms']:7.2f} ms  {result['queries_mean']:5.1f} queries/request"
+                  + (f"  {result['errors']} errors" if result['errors'] else ""))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.max_regression)
+        if regressions:
+            print(f"p50 regressed by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
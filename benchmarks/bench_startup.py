@@ -0,0 +1,138 @@
+"""
+Benchmark of process startup: importing app and running create_app().
+Each boot runs in a fresh interpreter against a throwaway SQLite database. The first
+boot creates the database, the following ones find it at the migration head. A last
+boot under `python -X importtime` lists the imports that take the longest, and shows
+whether the openai SDK was loaded at startup.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--top 15] [--depth 2] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bench_routes import REPO_DIR, RESULTS_DIR, git_revision
+
+# Runs in the child interpreter; prints one JSON line with its timings
+BOOT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app(json.loads(sys.argv[1]))
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'openai_imported': 'openai' in sys.modules
+}))
+"""
+
+def boot(config, importtime=False):
+    """
+    Starts a new interpreter that imports app and calls create_app(config).
+    Returns:
+        tuple: (timings dict with 'process_ms' added, stderr text)
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', BOOT_SCRIPT, json.dumps(config)]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Boot failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = elapsed
+    return timings, result.stderr
+
+def parse_importtime(stderr, depth):
+    """
+    Reads the `-X importtime` report.
+    Parameters:
+        stderr (str): stderr of the profiled boot.
+        depth (int): Only keep imports nested at most this deep below the top-level ones.
+    Returns:
+        list: {"module", "depth", "self_ms", "cumulative_ms"} sorted by cumulative time, largest first.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if level > depth:
+            continue
+        modules.append({
+            'module': name.strip(),
+            'depth': level,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+    modules.sort(key=lambda module: module['cumulative_ms'], reverse=True)
+    return modules
+
+def summarize(samples, key):
+    values = sorted(sample[key] for sample in samples)
+    return {'median_ms': round(statistics.median(values), 1), 'min_ms': round(values[0], 1), 'max_ms': round(values[-1], 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='Boots against the existing database.')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list.')
+    parser.add_argument('--depth', type=int, default=2, help='Nesting depth of the listed imports.')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/startup-<timestamp>.json).')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='task_tracker_startup_')
+    try:
+        config = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'startup.db'),
+            'LOG_FILE': os.path.join(workdir, 'app.log'),
+            'AI_PREFETCH_ENABLED': False,
+            'AI_SINGLE_FLIGHT': 'thread',
+            'EVENTS_RELAY': 'none'
+        }
+        first, _ = boot(config)
+        warm = [boot(config)[0] for _ in range(max(1, args.runs))]
+        profiled, stderr = boot(config, importtime=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'runs': len(warm)
+        },
+        'first_boot': {key: round(value, 1) for key, value in first.items() if key.endswith('_ms')},
+        'boot': {key: summarize(warm, key) for key in ('process_ms', 'import_ms', 'create_app_ms')},
+        'openai_imported': profiled['openai_imported'],
+        'imports': parse_importtime(stderr, args.depth)[:args.top]
+    }
+
+    print(f"First boot (creates the database): process {first['process_ms']:.0f} ms, "
+          f"import {first['import_ms']:.0f} ms, create_app {first['create_app_ms']:.0f} ms")
+    for key, summary in results['boot'].items():
+        print(f"{key:14} median {summary['median_ms']:7.1f} ms  min {summary['min_ms']:7.1f} ms  max {summary['max_ms']:7.1f} ms")
+    print(f"openai SDK imported at startup: {'yes' if profiled['openai_imported'] else 'no'}")
+    print(f"\nSlowest imports (python -X importtime, depth <= {args.depth}):")
+    for module in results['imports']:
+        print(f"  {module['cumulative_ms']:8.1f} ms cumulative  {module['self_ms']:7.1f} ms self  {'  ' * module['depth']}{module['module']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, 'startup-' + datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Local stand-in for the OpenAI client used by the benchmarks.
+Returns a valid problem set (or batch of sets) after an optional fixed delay,
+with token usage, so no network calls or API key are needed.
+"""
+import json
+import re
+import time
+from types import SimpleNamespace
+
+class StubCompletions:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, model=None, messages=(), **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]['content'] if messages else ''
+        problem_set = {
+            "questions_html": "<ul><li>What is 6 x 7?</li><li>Name a planet.</li><li>Why is the sky blue?</li></ul>",
+            "questions_and_hints": [
+                {"question": "What is 6 x 7?", "hint": "Think of 6 groups of 7."},
+                {"question": "Name a planet.", "hint": "We live on one."},
+                {"question": "Why is the sky blue?", "hint": "Sunlight scatters."}
+            ]
+        }
+        if '"sets"' in prompt:
+            # Batched prompt lists the children as "- Name (age N) at difficulty D"
+            users = re.findall(r"^- (.+?) \(age", prompt, re.MULTILINE)
+            content = json.dumps({"sets": [dict(problem_set, user=user) for user in users]})
+        else:
+            content = json.dumps(problem_set)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+        )
+
+def make_stub_client(latency=0.0):
+    """
+    Returns an object with the chat.completions.create interface of openai.OpenAI.
+    """
+    return SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(latency)))
@@ -0,0 +1,110 @@
+"""
+Synthetic data for the benchmarks.
+Seeds parents, children, tasks, days of task logs with daily summaries, and a
+questions log, using batched inserts so large scales seed in seconds.
+"""
+import random
+from datetime import date, time, timedelta
+
+from extensions import db
+from models import DailySummary, Parent, Task, TaskLog, User
+from question_store import get_question_store, make_entry
+from summaries import summarize_day
+from timezone_utils import now_pst
+
+FREQUENCIES = ["daily", "daily", "Mon, Wed, Fri", "Tue, Thu", "Sat, Sun", "Mon,Tue,Wed,Thu,Fri"]
+BATCH_SIZE = 5000
+
+def insert_batched(model, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[i:i + BATCH_SIZE])
+
+def seed_database(parents=2, children=3, tasks=20, days=365, questions=1000, seed=42):
+    """
+    Fills the current app's database and question store with synthetic data.
+    Parameters:
+        parents (int): Number of parents.
+        children (int): Children per parent.
+        tasks (int): Tasks per child.
+        days (int): Days of task logs per child, ending today.
+        questions (int): Question sets in the questions log, spread over the children and recent days;
+            every child also gets one for today.
+        seed (int): Random seed, so runs are comparable.
+    Returns:
+        dict: Seeded users as [{"id", "name", "task_ids"}] plus row counts.
+    """
+    rng = random.Random(seed)
+    today = now_pst()
+    dates = [(today - timedelta(days=offset)).date() for offset in range(days)]
+    counts = {'task_logs': 0, 'question_sets': 0}
+
+    users = []
+    for p in range(parents):
+        parent = Parent(name=f"Parent {p + 1}")
+        db.session.add(parent)
+        db.session.flush()
+        for c in range(children):
+            user = User(name=f"Kid {p + 1}-{c + 1}", dob=date(2012 + c % 6, 1 + c % 9, 15),
+                        ai_difficulty=rng.randint(5, 15), parent_id=parent.id)
+            db.session.add(user)
+            db.session.flush()
+            users.append(user)
+
+    seeded = []
+    for user in users:
+        task_rows = [{
+            "user_id": user.id,
+            "task": f"Task {t + 1}",
+            "frequency": FREQUENCIES[t % len(FREQUENCIES)],
+            "duration": rng.choice([None, 10, 20, 30]),
+            "log_completed_page_numbers": t % 7 == 0
+        } for t in range(tasks)]
+        insert_batched(Task, task_rows)
+        user_tasks = Task.query.filter_by(user_id=user.id).order_by(Task.id).all()
+
+        log_rows, summary_rows = [], []
+        for day in dates:
+            day_logs = []
+            for task in user_tasks:
+                if not task.schedule.is_due(day) or rng.random() < 0.15:
+                    continue
+                done = rng.random() < 0.85
+                day_logs.append(TaskLog(
+                    user_id=user.id, task_id=task.id, task=task.task, date=day,
+                    status="Done" if done else "TODO",
+                    time=time(rng.randint(7, 20), rng.randint(0, 59), rng.randint(0, 59)) if done else None
+                ))
+            if not day_logs:
+                continue
+            log_rows.extend({
+                "user_id": log.user_id, "task_id": log.task_id, "task": log.task, "date": log.date,
+                "status": log.status, "time": log.time
+            } for log in day_logs)
+            summary_rows.append(dict(summarize_day(day, user_tasks, day_logs), user_id=user.id, date=day))
+        insert_batched(TaskLog, log_rows)
+        insert_batched(DailySummary, summary_rows)
+        counts['task_logs'] += len(log_rows)
+        seeded.append({"id": user.id, "name": user.name, "difficulty": user.ai_difficulty,
+                       "task_ids": [task.id for task in user_tasks]})
+    db.session.commit()
+
+    # Questions log: today's set for every child, the rest spread over recent days
+    store = get_question_store()
+    entries = [make_entry(user["name"], user["difficulty"], problem_set(), today.strftime("%Y-%m-%d %H:%M:%S"))
+               for user in seeded]
+    for i in range(max(0, questions - len(entries))):
+        user = seeded[i % len(seeded)]
+        stamp = today - timedelta(days=rng.randint(1, max(1, min(days, 60))), seconds=rng.randint(0, 86399))
+        entries.append(make_entry(user["name"], rng.randint(1, 20), problem_set(), stamp.strftime("%Y-%m-%d %H:%M:%S")))
+    entries.sort(key=lambda entry: entry['timestamp'])
+    for i in range(0, len(entries), BATCH_SIZE):
+        store.append_many(entries[i:i + BATCH_SIZE])
+    counts['question_sets'] = len(entries)
+
+    return {"users": seeded, "counts": counts}
+
+def problem_set():
+    return {
+        "questions_html": "<ul><li>Seeded question</li></ul>",
+        "questions_and_hints": [{"question": "Seeded question", "hint": "Seeded hint"}]
+    }
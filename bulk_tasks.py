@@ -0,0 +1,160 @@
+"""
+Bulk task operations for the parent console.
+Copying a routine to several children is one INSERT ... SELECT, and a list of
+adds, edits and deletes for one child runs as a few executemany statements in a
+single transaction, instead of one lookup and one commit per task.
+"""
+from itertools import groupby
+
+from sqlalchemy import and_, bindparam, exists, insert, select, true
+
+from extensions import db
+from models import Task, User
+from page_cache import bump_data_version
+from summaries import refresh_daily_summary
+from timezone_utils import current_clock
+
+TASK_FIELDS = ('frequency', 'duration', 'log_completed_page_numbers')
+
+def copy_tasks(source_user_id, target_user_ids):
+    """
+    Copies a user's tasks to several users in one statement, without committing.
+    Tasks whose name a target user already has are skipped.
+    Parameters:
+        source_user_id (int): The user to copy from.
+        target_user_ids (list): The users to copy to; the source itself is ignored.
+    Returns:
+        int: Number of tasks inserted.
+    """
+    target_user_ids = {int(user_id) for user_id in target_user_ids} - {int(source_user_id)}
+    if not target_user_ids:
+        return 0
+
+    tasks = Task.__table__
+    source = tasks.alias('source')
+    existing = tasks.alias('existing')
+    rows = (
+        select(User.id, source.c.task, source.c.frequency, source.c.duration, source.c.log_completed_page_numbers)
+        .select_from(source)
+        .join(User.__table__, true())
+        .where(
+            source.c.user_id == int(source_user_id),
+            User.id.in_(target_user_ids),
+            ~exists().where(and_(existing.c.user_id == User.id, existing.c.task == source.c.task))
+        )
+    )
+    result = db.session.execute(
+        insert(tasks).from_select(['user_id', 'task', 'frequency', 'duration', 'log_completed_page_numbers'], rows)
+    )
+
+    # Today's due tasks changed for the targets
+    today = current_clock().today
+    for user_id in target_user_ids:
+        refresh_daily_summary(user_id, today)
+    bump_data_version(target_user_ids)
+    return result.rowcount
+
+def normalize_change(change):
+    """
+    Validates one change and converts its fields to column values.
+    Parameters:
+        change (dict): {"op": "add" | "edit" | "delete", "task": name, ...}; adds and edits may carry
+            frequency, duration and log_completed_page_numbers, edits also new_task.
+    Returns:
+        dict: The change with only known keys.
+    Raises:
+        ValueError: If the change is not an object, or the operation or a required field is missing.
+    """
+    if not isinstance(change, dict):
+        raise ValueError(f"Each change must be an object, got {change!r}")
+    op = change.get('op')
+    name = (change.get('task') or '').strip()
+    if op not in ('add', 'edit', 'delete'):
+        raise ValueError(f"Unknown operation: {op!r}")
+    if not name:
+        raise ValueError(f"Task name is required for {op}")
+
+    normalized = {'op': op, 'task': name}
+    if op == 'delete':
+        return normalized
+    if op == 'add' and not change.get('frequency'):
+        raise ValueError(f"Frequency is required to add {name}")
+    if op == 'edit' and change.get('new_task'):
+        normalized['new_task'] = change['new_task'].strip()
+    for field in TASK_FIELDS:
+        if field in change:
+            normalized[field] = change[field]
+    if 'duration' in normalized:
+        normalized['duration'] = int(normalized['duration']) if normalized['duration'] not in (None, '') else None
+    if 'log_completed_page_numbers' in normalized:
+        normalized['log_completed_page_numbers'] = bool(normalized['log_completed_page_numbers'])
+    return normalized
+
+def edited_columns(change):
+    return tuple(key for key in ('new_task',) + TASK_FIELDS if key in change)
+
+def apply_task_changes(user_id, changes):
+    """
+    Applies adds, edits and deletes to one user's tasks, without committing.
+    Deletes run first, then edits, then adds; adds of names the user already has are skipped.
+    Parameters:
+        user_id (int): The ID of the user.
+        changes (list): Change dicts as accepted by normalize_change.
+    Returns:
+        dict: Number of tasks added, edited and deleted.
+    Raises:
+        ValueError: If changes is not a list or a change is invalid; nothing is written in that case.
+    """
+    user_id = int(user_id)
+    if not isinstance(changes, list):
+        raise ValueError(f"Changes for user {user_id} must be a list")
+    changes = [normalize_change(change) for change in changes]
+    counts = {'added': 0, 'edited': 0, 'deleted': 0}
+    tasks = Task.__table__
+
+    deletes = [change['task'] for change in changes if change['op'] == 'delete']
+    if deletes:
+        result = db.session.execute(
+            tasks.delete().where(tasks.c.user_id == user_id, tasks.c.task.in_(deletes))
+        )
+        counts['deleted'] = result.rowcount
+
+    # executemany needs the same columns in every row, so group edits by the fields they set
+    edits = [change for change in changes if change['op'] == 'edit']
+    for columns, group in groupby(sorted(edits, key=edited_columns), key=edited_columns):
+        if not columns:
+            continue
+        stmt = tasks.update().where(
+            tasks.c.user_id == user_id, tasks.c.task == bindparam('old_task')
+        ).values({
+            ('task' if column == 'new_task' else column): bindparam('v_' + column) for column in columns
+        })
+        params = [
+            dict({'old_task': change['task']}, **{'v_' + column: change[column] for column in columns})
+            for change in group
+        ]
+        counts['edited'] += db.session.execute(stmt, params).rowcount
+
+    adds = {change['task']: change for change in changes if change['op'] == 'add'}
+    if adds:
+        existing = set(db.session.scalars(
+            select(Task.task).where(Task.user_id == user_id, Task.task.in_(adds.keys()))
+        ))
+        rows = [
+            {
+                'user_id': user_id,
+                'task': name,
+                'frequency': change['frequency'],
+                'duration': change.get('duration'),
+                'log_completed_page_numbers': change.get('log_completed_page_numbers', False)
+            }
+            for name, change in adds.items() if name not in existing
+        ]
+        if rows:
+            db.session.execute(tasks.insert(), rows)
+            counts['added'] = len(rows)
+
+    # Today's due tasks may have changed, keep the day's summary in sync
+    refresh_daily_summary(user_id, current_clock().today)
+    bump_data_version([user_id])
+    return counts
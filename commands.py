@@ -0,0 +1,66 @@
+"""
+Flask CLI commands for one-off maintenance jobs.
+Run them with `flask --app app <command>`.
+"""
+import click
+
+import legacy_import
+import question_store
+from problem_generator import get_problem_generator
+from models import User
+from summaries import backfill_daily_summaries
+
+def register_commands(app):
+    """
+    Registers the maintenance commands on the app's CLI.
+    """
+    @app.cli.command('import-questions')
+    @click.option('--path', default=question_store.QUESTIONS_LOG_FILE, show_default=True,
+                  help='Legacy questions_log.json to import.')
+    def import_questions(path):
+        """Import the legacy questions_log.json into the question store."""
+        imported, skipped = question_store.import_legacy_json(question_store.get_question_store(), path)
+        click.echo(f"Imported {imported} question sets ({skipped} old-format entries skipped)")
+
+    @app.cli.command('backfill-summaries')
+    @click.option('--user-id', type=int, multiple=True, help='Only rebuild these users (repeatable).')
+    def backfill_summaries(user_id):
+        """Rebuild daily_summaries from task_logs."""
+        user_ids = list(user_id) or [user.id for user in User.query.order_by(User.id)]
+        written = backfill_daily_summaries(user_ids)
+        click.echo(f"Wrote {written} daily summaries for {len(user_ids)} users")
+
+    @app.cli.command('import-legacy')
+    @click.option('--data-dir', default=question_store.DATA_DIR, show_default=True,
+                  help='Directory with user_difficulty.csv, tasks.csv and task_log.csv.')
+    @click.option('--batch-size', type=int, default=5000, show_default=True, help='Rows per batched insert.')
+    @click.option('--create-users', is_flag=True,
+                  help='Create users missing from the database (date of birth left empty) instead of skipping their rows.')
+    def import_legacy(data_dir, batch_size, create_users):
+        """Import the legacy CSV files into users, tasks and task_logs."""
+        results, resolver = legacy_import.import_legacy_csvs(data_dir, max(1, batch_size), create_users)
+        if not results:
+            click.echo(f"No legacy CSV files found in {data_dir}")
+            return
+        for file_name, stats in results.items():
+            rate = stats['read'] / stats['seconds'] if stats['seconds'] else float('inf')
+            click.echo(f"{file_name}: {stats['read']} rows read, {stats['written']} written, "
+                       f"{stats['skipped']} skipped in {stats['seconds']:.2f}s ({rate:,.0f} rows/sec)")
+        if resolver.created:
+            click.echo(f"Created users (set their date of birth on the parent page): {', '.join(resolver.created)}")
+        if resolver.unknown:
+            click.echo(f"Skipped rows of unknown users (use --create-users to add them): {', '.join(sorted(resolver.unknown))}")
+
+        # Imported days need their star ratings
+        user_ids = sorted(results.get(legacy_import.LEGACY_LOGS_FILE, {}).get('user_ids', ()))
+        if user_ids:
+            written = backfill_daily_summaries(user_ids)
+            click.echo(f"Rebuilt {written} daily summaries")
+
+    @app.cli.command('prefetch-problems')
+    def prefetch_problems():
+        """Generate today's AI problem sets for users without one (run from cron after Pacific midnight)."""
+        generator = get_problem_generator()
+        queued = generator.prefetch_all()
+        generator.shutdown(wait=True)
+        click.echo(f"Ran AI problem generation for {queued} users")
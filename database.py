@@ -0,0 +1,141 @@
+"""
+Database profiles for create_app.
+The URI comes from DATABASE_URL, so the same code runs on the default SQLite file
+or a local PostgreSQL. With the "production" profile (DB_PROFILE, the default),
+SQLite connections switch to WAL journaling with tuned pragmas on connect, so
+check-offs from several devices no longer block readers, and every database gets
+pool sizing and pre-ping through SQLALCHEMY_ENGINE_OPTIONS.
+
+ensure_schema replaces the unconditional db.create_all() at boot: a database already
+stamped with the Alembic head costs one query, and a new database is created from
+the models and stamped so later boots take that path.
+
+load_database_id gives each database a random id on first boot. Caches kept outside
+the database, like the disk page cache, include it in their keys: counters such as
+users.data_version start again at 0 in a new database, and its pages must not be
+mistaken for those of the one it replaced.
+"""
+import logging
+import os
+import uuid
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import DatabaseInfo
+
+DEFAULT_DATABASE_URI = 'sqlite:///task_tracker.db'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+logger = logging.getLogger(__name__)
+
+# Applied to every new SQLite connection, in this order
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',         # Readers do not block the writer and vice versa
+    'synchronous': 'NORMAL',       # Safe with WAL, avoids an fsync per commit
+    'busy_timeout': 5000,          # Wait up to 5 s for a lock instead of "database is locked"
+    'mmap_size': 268435456,        # Memory-map up to 256 MB of the database file
+    'cache_size': -20000,          # ~20 MB page cache per connection
+    'foreign_keys': 'ON'
+}
+
+def is_memory_sqlite(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+def configure_database(app):
+    """
+    Fills in SQLALCHEMY_ENGINE_OPTIONS for the configured URI. Call before db.init_app.
+    Options already present in the config are kept.
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    profile = app.config.setdefault('DB_PROFILE', os.environ.get('DB_PROFILE', 'production'))
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+
+    if profile == 'production':
+        options.setdefault('pool_pre_ping', True)
+        if not (uri.startswith('sqlite') and is_memory_sqlite(uri)):
+            options.setdefault('pool_size', int(os.environ.get('DB_POOL_SIZE', 10)))
+            options.setdefault('max_overflow', int(os.environ.get('DB_MAX_OVERFLOW', 20)))
+            options.setdefault('pool_timeout', int(os.environ.get('DB_POOL_TIMEOUT', 30)))
+        if not uri.startswith('sqlite'):
+            options.setdefault('pool_recycle', int(os.environ.get('DB_POOL_RECYCLE', 1800)))
+        app.config.setdefault('SQLITE_PRAGMAS', dict(SQLITE_PRAGMAS))
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def init_app(app):
+    """
+    Registers the SQLite pragma hook on the app's engines. Call after db.init_app.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', apply_sqlite_pragmas)
+
+def ensure_schema(app):
+    """
+    Makes sure the tables exist, skipping db.create_all() when the database is at the Alembic head.
+    A database without tables is created from the models and stamped with the head. One at an
+    older revision still gets create_all(), as the migrations expect; `flask db upgrade` does the rest.
+    Returns:
+        str: "current", "created" or "create_all".
+    """
+    script = ScriptDirectory(app.config.get('MIGRATIONS_DIR', MIGRATIONS_DIR))
+    heads = set(script.get_heads())
+    with app.app_context():
+        with db.engine.connect() as connection:
+            if set(MigrationContext.configure(connection).get_current_heads()) == heads:
+                return 'current'
+            empty = not inspect(connection).get_table_names()
+
+        db.create_all()
+        if not empty:
+            logger.info("Database is not at the migration head %s, run `flask db upgrade`", ', '.join(sorted(heads)))
+            return 'create_all'
+        with db.engine.begin() as connection:
+            MigrationContext.configure(connection).stamp(script, 'heads')
+        logger.info("Created the database tables at migration head %s", ', '.join(sorted(heads)))
+        return 'created'
+
+def load_database_id(app):
+    """
+    Reads the database's random id into app.extensions['database_id'], creating it on the
+    first boot against a new database. Call after ensure_schema.
+    Returns:
+        str: The id.
+    """
+    with app.app_context():
+        info = db.session.get(DatabaseInfo, 1)
+        if info is None:
+            db.session.add(DatabaseInfo(id=1, instance_id=uuid.uuid4().hex))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Another worker booting at the same time created it
+            info = db.session.get(DatabaseInfo, 1)
+        app.extensions['database_id'] = info.instance_id
+    return app.extensions['database_id']
+
+def dispose_engines(app):
+    """
+    Drops the pooled connections a forked worker inherited, without closing them, so the
+    parent keeps using its connections and the worker opens its own.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,224 @@
+"""
+In-process publish/subscribe for live updates.
+log_task_status publishes each status change on the user's channel and the /events
+stream pushes it to every connected page, which patches the one row in place.
+Each subscriber has its own bounded queue, so a slow client never blocks a request.
+With several worker processes on one host, SocketEventRelay forwards events between
+them over Unix datagram sockets in data/events/, a local stand-in for a pub/sub server.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+SOCKET_DIR = os.path.join(os.path.dirname(__file__), 'data', 'events')
+
+# Sent to a subscriber whose queue overflowed; the page reloads instead of patching
+RESYNC = {'type': 'resync'}
+
+def user_channel(user_id):
+    return f"user:{int(user_id)}"
+
+class Subscription:
+    """
+    One connected client: a bounded queue of events on a channel.
+    """
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # The client fell behind; drop what it missed and ask it to reload
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            try:
+                self._queue.put_nowait(RESYNC)
+            except queue.Full:
+                pass
+
+    def get(self, timeout=None):
+        """
+        Returns the next event, or None if none arrived within timeout seconds.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class EventBroker:
+    """
+    Fans events out to the subscribers of a channel in this process.
+    Parameters:
+        queue_size (int): Events buffered per subscriber before it is asked to resync.
+    """
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.relay = None
+        self._lock = threading.Lock()
+        self._channels = {}  # channel -> set of Subscription
+
+    def subscribe(self, channel):
+        if self.relay is not None:
+            self.relay.listen()
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def deliver(self, channel, event):
+        """
+        Hands an event to the local subscribers of a channel.
+        """
+        with self._lock:
+            subscribers = tuple(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def publish(self, channel, event):
+        """
+        Delivers an event locally and, when a relay is attached, to the other worker processes.
+        """
+        self.deliver(channel, event)
+        if self.relay is not None:
+            self.relay.send(channel, event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+class SocketEventRelay:
+    """
+    Forwards events between processes on one host. Every process with subscribers binds a
+    datagram socket in socket_dir, and each published event is sent to all the other sockets there;
+    sockets of processes that have exited are removed on the first failed send.
+    """
+    def __init__(self, broker, socket_dir=SOCKET_DIR):
+        self.broker = broker
+        self.socket_dir = socket_dir
+        self.pid = os.getpid()
+        os.makedirs(socket_dir, exist_ok=True)
+        self.path = os.path.join(socket_dir, f"{self.pid}-{uuid.uuid4().hex[:8]}.sock")
+        self._lock = threading.Lock()
+        self._receiver = None  # Bound by listen()
+        self._listening = False
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        atexit.register(self.close)
+
+    def listen(self):
+        """
+        Binds this process's socket and starts its receive thread, once. Called on the first
+        subscription, so a process without /events streams (such as a gunicorn master that
+        preloads the app) runs no thread and is not sent events.
+        """
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            try:
+                receiver.bind(self.path)
+            except OSError as e:
+                receiver.close()
+                logger.warning("Live updates limited to this process, could not bind relay socket: %s", e)
+                return
+            self._receiver = receiver
+        threading.Thread(target=self._receive_loop, args=(receiver,), name='event-relay', daemon=True).start()
+
+    def send(self, channel, event):
+        payload = json.dumps({'channel': channel, 'event': event}).encode('utf-8')
+        for entry in os.scandir(self.socket_dir):
+            if not entry.name.endswith('.sock') or entry.path == self.path:
+                continue
+            try:
+                self._sender.sendto(payload, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Nobody listens there any more
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError):
+                pass  # Receiver is backed up; live updates are best effort
+
+    def _receive_loop(self, receiver):
+        while True:
+            try:
+                payload = receiver.recv(65536)
+            except OSError:
+                return  # Socket closed
+            try:
+                message = json.loads(payload)
+                self.broker.deliver(message['channel'], message['event'])
+            except (ValueError, KeyError) as e:
+                logger.warning("Ignoring malformed relayed event: %s", e)
+
+    def close(self):
+        try:
+            self._sender.close()
+            if self._receiver is not None:
+                self._receiver.close()
+                # A forked worker only closes its copies; the socket file belongs to the process that bound it
+                if os.getpid() == self.pid:
+                    os.unlink(self.path)
+        except OSError:
+            pass
+
+def init_app(app):
+    """
+    Creates the event broker; EVENTS_RELAY selects "socket" (default, forwards between
+    processes on one host) or "none" (this process only).
+    """
+    broker = EventBroker(queue_size=app.config.get('EVENTS_QUEUE_SIZE', 100))
+    attach_relay(app, broker)
+    app.extensions['event_broker'] = broker
+
+def attach_relay(app, broker):
+    """
+    Attaches a relay when EVENTS_RELAY is "socket"; its socket is bound on the first subscription.
+    """
+    if app.config.get('EVENTS_RELAY', 'socket') == 'socket' and hasattr(socket, 'AF_UNIX'):
+        try:
+            broker.relay = SocketEventRelay(broker, app.config.get('EVENTS_SOCKET_DIR', SOCKET_DIR))
+        except OSError as e:
+            logger.warning("Live updates limited to this process, could not bind relay socket: %s", e)
+
+def restart_relay(app):
+    """
+    Gives a worker forked from a process that already created the app its own relay, so it
+    does not send from the parent's socket or reuse its socket path.
+    """
+    broker = app.extensions['event_broker']
+    if broker.relay is not None:
+        broker.relay.close()
+        broker.relay = None
+    attach_relay(app, broker)
+
+def get_event_broker():
+    """
+    Returns the event broker of the current app.
+    """
+    return current_app.extensions['event_broker']
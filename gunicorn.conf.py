@@ -0,0 +1,49 @@
+"""
+Gunicorn settings for serving wsgi:app; gunicorn reads this file from the working
+directory by default, so `gunicorn wsgi:app` is enough. Each setting can be
+overridden with the environment variable next to it.
+"""
+import multiprocessing
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Processes spread requests over the cores; threads keep a worker busy while requests
+# wait on the database or OpenAI and while /events streams stay open
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+
+# Seconds an idle keep-alive connection stays open, e.g. between a page and its polls
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# A worker that does not check in for this long is restarted
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# On TERM or HUP, workers get this long to finish their requests before they are killed
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Recycle a worker after this many requests (0 = never), spread by the jitter so they do not restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Create the app once in the master and fork the workers from it: boots faster and shares
+# the imported code between workers. HUP then restarts the workers but not the code;
+# restart_app.sh does a full restart.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+pidfile = os.environ.get('GUNICORN_PIDFILE', os.path.join(BASE_DIR, 'logs', 'gunicorn.pid'))
+os.makedirs(os.path.dirname(os.path.abspath(pidfile)), exist_ok=True)
+# The app writes one JSON line per request itself, gunicorn only reports its own events
+accesslog = None
+errorlog = '-'
+
+# Rotating one log file from several processes would lose lines, so each process writes and
+# rotates its own (LOG_MAX_BYTES, LOG_BACKUP_COUNT). restart_app.sh moves the files of the
+# previous run to logs/previous/, so those of exited workers do not pile up.
+os.environ.setdefault('LOG_FILE', os.path.join(BASE_DIR, 'logs', 'app.{pid}.log'))
+
+def post_fork(server, worker):
+    # Without preload the worker imports and creates its own app after this hook
+    if server.cfg.preload_app:
+        import wsgi
+        wsgi.after_fork()
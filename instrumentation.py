@@ -0,0 +1,254 @@
+"""
+Request-level performance instrumentation.
+Every request records its wall time, the number and time of its SQL statements
+(from SQLAlchemy engine events), question-store and page-cache file I/O and OpenAI calls. The
+totals go out as a Server-Timing header on the response and are aggregated into
+Prometheus text served at /metrics. Metrics are kept per process and every series
+carries a pid label: with several gunicorn workers a scrape only sees the worker that
+answered it, and the label keeps each worker's counters a series of their own instead
+of one that jumps between workers. Sum over pid for totals; a restarted worker starts
+new series.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+from extensions import db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# name -> (type, help)
+METRIC_INFO = {
+    'http_requests_total': ('counter', 'HTTP requests by endpoint, method and status'),
+    'http_request_duration_seconds': ('histogram', 'Wall time of HTTP requests'),
+    'db_queries_total': ('counter', 'SQL statements executed, by endpoint ("background" outside requests)'),
+    'db_query_duration_seconds': ('histogram', 'Time spent executing SQL statements'),
+    'file_io_seconds': ('histogram', 'Time spent on file I/O, by operation (jsonl_* for the question log, page_cache_* for cached pages)'),
+    'page_cache_requests_total': ('counter', 'Rendered page cache lookups by page and outcome'),
+    'openai_requests_total': ('counter', 'OpenAI calls by operation and outcome'),
+    'openai_request_duration_seconds': ('histogram', 'Latency of OpenAI calls'),
+    'openai_tokens_total': ('counter', 'Tokens used by OpenAI calls'),
+}
+
+class Metrics:
+    """
+    Thread-safe counters and histograms rendered in the Prometheus text format.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format, labelled with this process's pid.
+        """
+        process = (('pid', os.getpid()),)
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(value[0]), value[1], value[2]) for key, value in self._histograms.items()}
+
+        lines = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+        for name in names:
+            metric_type, help_text = METRIC_INFO.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    labels = process + labels
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+            for (metric, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                labels = process + labels
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', repr(bound)),))} {bucket_count}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+# One registry per process, also used by background threads outside requests
+METRICS = Metrics()
+
+class RequestStats:
+    """
+    Totals of one request, kept on flask.g.
+    """
+    __slots__ = ('started', 'sql_count', 'sql_seconds', 'io_seconds', 'openai_count', 'openai_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.io_seconds = 0.0
+        self.openai_count = 0
+        self.openai_seconds = 0.0
+
+def request_stats():
+    """
+    Returns the stats of the current request, or None outside a request.
+    """
+    if not has_request_context():
+        return None
+    return g.get('request_stats')
+
+def current_endpoint():
+    if not has_request_context():
+        return 'background'
+    return request.endpoint or 'unmatched'
+
+@contextmanager
+def measure_io(operation):
+    """
+    Times a block of question-store or page-cache file I/O, recorded in file_io_seconds by operation.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        METRICS.observe('file_io_seconds', elapsed, operation=operation)
+        stats = request_stats()
+        if stats is not None:
+            stats.io_seconds += elapsed
+
+class OpenAICall:
+    """
+    Handle of an OpenAI call in progress; set .response so token usage is recorded.
+    """
+    __slots__ = ('response',)
+
+    def __init__(self):
+        self.response = None
+
+@contextmanager
+def openai_call(operation):
+    """
+    Times an OpenAI request and records its outcome and token usage.
+    """
+    call = OpenAICall()
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield call
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - started
+        METRICS.observe('openai_request_duration_seconds', elapsed, operation=operation)
+        METRICS.inc('openai_requests_total', operation=operation, outcome=outcome)
+        usage = getattr(call.response, 'usage', None)
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            tokens = getattr(usage, kind, None)
+            if isinstance(tokens, int):
+                METRICS.inc('openai_tokens_total', tokens, operation=operation, type=kind.split('_')[0])
+        stats = request_stats()
+        if stats is not None:
+            stats.openai_count += 1
+            stats.openai_seconds += elapsed
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    _record_query(time.perf_counter() - started)
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        _record_query(time.perf_counter() - started.pop())
+
+def _record_query(elapsed):
+    endpoint = current_endpoint()
+    METRICS.inc('db_queries_total', endpoint=endpoint)
+    METRICS.observe('db_query_duration_seconds', elapsed, endpoint=endpoint)
+    stats = request_stats()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+
+def server_timing(stats, total):
+    """
+    Formats a request's totals as a Server-Timing header value (durations in milliseconds).
+    """
+    parts = [
+        f"app;dur={total * 1000:.1f}",
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"'
+    ]
+    if stats.io_seconds:
+        parts.append(f"io;dur={stats.io_seconds * 1000:.1f}")
+    if stats.openai_count:
+        parts.append(f'openai;dur={stats.openai_seconds * 1000:.1f};desc="{stats.openai_count} calls"')
+    return ", ".join(parts)
+
+def init_app(app):
+    """
+    Hooks the SQL and request timers into the app and serves /metrics.
+    Does nothing when INSTRUMENTATION_ENABLED is false.
+    """
+    if not app.config.get('INSTRUMENTATION_ENABLED', True):
+        return
+    app.extensions['metrics'] = METRICS
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        endpoint = current_endpoint()
+        METRICS.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+        METRICS.observe('http_request_duration_seconds', total, endpoint=endpoint)
+        response.headers['Server-Timing'] = server_timing(stats, total)
+        return response
+
+    def metrics():
+        return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+    app.add_url_rule('/metrics', 'metrics', metrics)
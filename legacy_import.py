@@ -0,0 +1,282 @@
+"""
+Streaming import of the pre-SQLite CSV files in data/.
+user_difficulty.csv, tasks.csv and task_log.csv are read row by row and written
+in batches with executemany inside one transaction, so memory stays flat however
+long the log export is. Duplicates are skipped: tasks by (user, task) name, logs
+by the unique (user_id, date, task_id) index, or by task name for logs of tasks
+that no longer exist.
+"""
+import csv
+import os
+import time
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, tuple_
+
+from extensions import db, UPSERT_INSERTS
+from models import Parent, Task, TaskLog, User
+from page_cache import bump_data_version
+from question_store import DATA_DIR
+
+LEGACY_USERS_FILE = 'user_difficulty.csv'
+LEGACY_TASKS_FILE = 'tasks.csv'
+LEGACY_LOGS_FILE = 'task_log.csv'
+
+class UserResolver:
+    """
+    Maps legacy user names to ids, loading all users once.
+    Parameters:
+        create_users (bool): Create unknown users (with an empty date of birth to fill in
+            on the parent page) instead of skipping their rows.
+        parent_name (str): Parent that created users belong to.
+    """
+    def __init__(self, create_users=False, parent_name="Shanhu"):
+        self.create_users = create_users
+        self.parent_name = parent_name
+        self.ids = {}
+        for user in User.query.order_by(User.id.desc()):
+            self.ids[user.name] = user.id  # Lowest id wins for duplicate names
+        self.unknown = set()
+        self.created = []
+        self._parent_id = None
+
+    def resolve(self, name):
+        """
+        Returns the user id for a name, or None if the user is unknown and not created.
+        """
+        user_id = self.ids.get(name)
+        if user_id is not None or not name:
+            return user_id
+        if not self.create_users:
+            self.unknown.add(name)
+            return None
+        user = User(name=name, dob=None, ai_difficulty=10, parent_id=self.parent_id())
+        db.session.add(user)
+        db.session.flush()
+        self.ids[name] = user.id
+        self.created.append(name)
+        return user.id
+
+    def parent_id(self):
+        if self._parent_id is None:
+            parent = Parent.query.filter_by(name=self.parent_name).first()
+            if not parent:
+                parent = Parent(name=self.parent_name)
+                db.session.add(parent)
+                db.session.flush()
+            self._parent_id = parent.id
+        return self._parent_id
+
+def read_csv_rows(path):
+    """
+    Yields the rows of a CSV file as dicts with stripped values, skipping blank lines.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            if not any(row.values()):
+                continue
+            yield {key: (value or '').strip() for key, value in row.items() if key}
+
+def parse_log_date(value):
+    """
+    Parses a "YYYY-MM-DD" date, returning None when it is empty or malformed.
+    """
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def parse_log_time(value):
+    """
+    Parses an "HH:MM:SS" (or "HH:MM") time, returning None when it is empty or malformed.
+    """
+    for time_format in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(value, time_format).time() if value else None
+        except ValueError:
+            continue
+    return None
+
+def import_user_difficulties(path, resolver, batch_size):
+    """
+    Sets ai_difficulty from user_difficulty.csv (columns user, difficulty).
+    Returns:
+        dict: rows read, written and skipped.
+    """
+    stats = {'read': 0, 'written': 0, 'skipped': 0}
+    users = User.__table__
+    stmt = users.update().where(users.c.id == bindparam('b_id')).values(ai_difficulty=bindparam('b_difficulty'))
+    batch = []
+    for row in read_csv_rows(path):
+        stats['read'] += 1
+        user_id = resolver.resolve(row.get('user'))
+        try:
+            difficulty = max(1, min(20, int(row.get('difficulty'))))
+        except (TypeError, ValueError):
+            difficulty = None
+        if user_id is None or difficulty is None:
+            stats['skipped'] += 1
+            continue
+        batch.append({'b_id': user_id, 'b_difficulty': difficulty})
+        if len(batch) >= batch_size:
+            db.session.execute(stmt, batch)
+            stats['written'] += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(stmt, batch)
+        stats['written'] += len(batch)
+    return stats
+
+def import_tasks(path, resolver, batch_size):
+    """
+    Inserts tasks from tasks.csv (columns user, task, frequency); names a user already has are skipped.
+    Returns:
+        dict: rows read, written and skipped.
+    """
+    stats = {'read': 0, 'written': 0, 'skipped': 0}
+    # Task lists are short, so the (user, name) pairs fit in memory
+    seen = set(db.session.query(Task.user_id, Task.task))
+    tasks = Task.__table__
+    batch = []
+    for row in read_csv_rows(path):
+        stats['read'] += 1
+        user_id = resolver.resolve(row.get('user'))
+        name = row.get('task')
+        if user_id is None or not name or not row.get('frequency') or (user_id, name) in seen:
+            stats['skipped'] += 1
+            continue
+        seen.add((user_id, name))
+        batch.append({
+            'user_id': user_id,
+            'task': name,
+            'frequency': row['frequency'],
+            'duration': None,
+            'log_completed_page_numbers': False
+        })
+        if len(batch) >= batch_size:
+            db.session.execute(tasks.insert(), batch)
+            stats['written'] += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(tasks.insert(), batch)
+        stats['written'] += len(batch)
+    return stats
+
+def insert_missing_logs(rows, key_columns):
+    """
+    Inserts the rows whose key is not in task_logs yet, keeping the first row of each key in the batch.
+    Returns:
+        int: Number of rows inserted.
+    """
+    columns = [getattr(TaskLog, name) for name in key_columns]
+    keys = [tuple(row[name] for name in key_columns) for row in rows]
+    existing = set(db.session.query(*columns).filter(tuple_(*columns).in_(keys)))
+    fresh = {}
+    for key, row in zip(keys, rows):
+        if key not in existing:
+            fresh.setdefault(key, row)
+    if fresh:
+        db.session.execute(TaskLog.__table__.insert(), list(fresh.values()))
+    return len(fresh)
+
+def insert_task_logs(rows):
+    """
+    Inserts a batch of log rows, skipping logs that already exist: by (user_id, date, task_id)
+    for rows of existing tasks, by (user_id, date, task name) for the others.
+    Returns:
+        int: Number of rows inserted.
+    """
+    linked = [row for row in rows if row['task_id'] is not None]
+    unlinked = [row for row in rows if row['task_id'] is None]
+    inserted = 0
+    dialect = db.session.get_bind().dialect.name
+    if linked and dialect in UPSERT_INSERTS:
+        stmt = UPSERT_INSERTS[dialect](TaskLog.__table__).on_conflict_do_nothing(
+            index_elements=['user_id', 'date', 'task_id']
+        )
+        result = db.session.execute(stmt, linked)
+        inserted += result.rowcount if result.rowcount >= 0 else len(linked)
+    elif linked:
+        inserted += insert_missing_logs(linked, ('user_id', 'date', 'task_id'))
+    if unlinked:
+        inserted += insert_missing_logs(unlinked, ('user_id', 'date', 'task'))
+    return inserted
+
+def import_task_logs(path, resolver, batch_size):
+    """
+    Inserts logs from task_log.csv (columns user, date, task, status, time), linked to the
+    user's task of the same name when there is one.
+    Rows with a malformed date are skipped; a malformed time is left empty.
+    Returns:
+        dict: rows read, written and skipped, plus the ids of users that got logs.
+    """
+    stats = {'read': 0, 'written': 0, 'skipped': 0}
+    user_ids = set()
+    task_ids = {}
+    for task_id, user_id, name in db.session.query(Task.id, Task.user_id, Task.task).order_by(Task.id.desc()):
+        task_ids[(user_id, name)] = task_id  # Lowest id wins for duplicate names
+    batch = []
+    for row in read_csv_rows(path):
+        stats['read'] += 1
+        user_id = resolver.resolve(row.get('user'))
+        log_date = parse_log_date(row.get('date'))
+        if user_id is None or log_date is None or not row.get('task') or not row.get('status'):
+            stats['skipped'] += 1
+            continue
+        user_ids.add(user_id)
+        batch.append({
+            'user_id': user_id,
+            'task_id': task_ids.get((user_id, row['task'])),
+            'task': row['task'],
+            'date': log_date,
+            'status': row['status'],
+            'time': parse_log_time(row.get('time')),
+            'completed_page_numbers': row.get('completed_page_numbers') or None
+        })
+        if len(batch) >= batch_size:
+            written = insert_task_logs(batch)
+            stats['written'] += written
+            stats['skipped'] += len(batch) - written
+            batch = []
+    if batch:
+        written = insert_task_logs(batch)
+        stats['written'] += written
+        stats['skipped'] += len(batch) - written
+    stats['user_ids'] = user_ids
+    return stats
+
+def import_legacy_csvs(data_dir=DATA_DIR, batch_size=5000, create_users=False):
+    """
+    Imports the legacy CSV files that exist in data_dir in one transaction.
+    Parameters:
+        data_dir (str): Directory holding the legacy CSV files.
+        batch_size (int): Rows per executemany.
+        create_users (bool): Create users that are not in the database instead of skipping their rows.
+    Returns:
+        tuple: (results, resolver) where results maps each imported file name to its stats
+            including 'seconds'.
+    """
+    resolver = UserResolver(create_users=create_users)
+    steps = [
+        (LEGACY_USERS_FILE, import_user_difficulties),
+        (LEGACY_TASKS_FILE, import_tasks),
+        (LEGACY_LOGS_FILE, import_task_logs)
+    ]
+    results = {}
+    try:
+        for file_name, import_file in steps:
+            path = os.path.join(data_dir, file_name)
+            if not os.path.exists(path):
+                continue
+            started = time.perf_counter()
+            stats = import_file(path, resolver, batch_size)
+            stats['seconds'] = time.perf_counter() - started
+            results[file_name] = stats
+        if results:
+            # Imported rows can touch any user's pages
+            bump_data_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return results, resolver
@@ -0,0 +1,30 @@
+"""Add database_info table
+
+Revision ID: 2e8c4a6f0b51
+Revises: 9d2b6e4f1a73
+Create Date: 2026-10-18 22:05:47.302614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e8c4a6f0b51'
+down_revision = '9d2b6e4f1a73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() creates the table on databases behind the head; the row is added at boot
+    if 'database_info' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('database_info',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('instance_id', sa.String(length=32), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('database_info')
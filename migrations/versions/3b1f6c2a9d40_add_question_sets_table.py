@@ -0,0 +1,42 @@
+"""Add question_sets table
+
+Revision ID: 3b1f6c2a9d40
+Revises: fec035e084a2
+Create Date: 2026-10-18 09:12:41.208331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2a9d40'
+down_revision = 'fec035e084a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may already have created the table
+    if 'question_sets' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('question_sets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user', sa.String(length=50), nullable=False),
+        sa.Column('difficulty', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(length=10), nullable=False),
+        sa.Column('timestamp', sa.String(length=19), nullable=False),
+        sa.Column('questions_html', sa.Text(), nullable=False),
+        sa.Column('questions_and_hints', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('question_sets', schema=None) as batch_op:
+        batch_op.create_index('ix_question_sets_lookup', ['user', 'difficulty', 'date', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('question_sets', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_sets_lookup')
+
+    op.drop_table('question_sets')
@@ -0,0 +1,46 @@
+"""Add unique (user_id, date, task) index on task_logs and index on tasks.user_id
+
+Revision ID: 8e4a7d19c2b5
+Revises: 3b1f6c2a9d40
+Create Date: 2026-10-18 10:02:17.553610
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4a7d19c2b5'
+down_revision = '3b1f6c2a9d40'
+branch_labels = None
+depends_on = None
+
+
+def _index_names(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Drop duplicate logs before adding the unique index, keeping the first row of each
+    # (user_id, date, task) which is the one the app has been reading and updating
+    op.execute(
+        "DELETE FROM task_logs WHERE id NOT IN "
+        "(SELECT MIN(id) FROM task_logs GROUP BY user_id, date, task)"
+    )
+
+    # create_app() runs db.create_all(), which creates these indexes on a fresh database
+    if 'ux_task_logs_user_date_task' not in _index_names('task_logs'):
+        with op.batch_alter_table('task_logs', schema=None) as batch_op:
+            batch_op.create_index('ux_task_logs_user_date_task', ['user_id', 'date', 'task'], unique=True)
+
+    if 'ix_tasks_user_id' not in _index_names('tasks'):
+        with op.batch_alter_table('tasks', schema=None) as batch_op:
+            batch_op.create_index('ix_tasks_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_user_id')
+
+    with op.batch_alter_table('task_logs', schema=None) as batch_op:
+        batch_op.drop_index('ux_task_logs_user_date_task')
@@ -0,0 +1,32 @@
+"""Drop the task_logs (user_id, updated_at) index
+
+Revision ID: 9d2b6e4f1a73
+Revises: f3a8d5c2e914
+Create Date: 2026-10-18 21:34:12.581940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2b6e4f1a73'
+down_revision = 'f3a8d5c2e914'
+branch_labels = None
+depends_on = None
+
+
+def _index_names(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # The JSON API validates against users.data_version now, nothing reads the latest updated_at
+    if 'ix_task_logs_user_updated' in _index_names('task_logs'):
+        with op.batch_alter_table('task_logs', schema=None) as batch_op:
+            batch_op.drop_index('ix_task_logs_user_updated')
+
+
+def downgrade():
+    with op.batch_alter_table('task_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_task_logs_user_updated', ['user_id', 'updated_at'], unique=False)
@@ -0,0 +1,48 @@
+"""Add updated_at to tasks and task_logs
+
+Revision ID: a7e3c1d9f052
+Revises: c5d92e07a1f3
+Create Date: 2026-10-18 11:20:36.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c1d9f052'
+down_revision = 'c5d92e07a1f3'
+branch_labels = None
+depends_on = None
+
+
+def _column_names(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _index_names(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Existing rows keep NULL until their next change; the API validators ignore NULLs
+    if 'updated_at' not in _column_names('tasks'):
+        with op.batch_alter_table('tasks', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    if 'updated_at' not in _column_names('task_logs'):
+        with op.batch_alter_table('task_logs', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    if 'ix_task_logs_user_updated' not in _index_names('task_logs'):
+        with op.batch_alter_table('task_logs', schema=None) as batch_op:
+            batch_op.create_index('ix_task_logs_user_updated', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_logs_user_updated')
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
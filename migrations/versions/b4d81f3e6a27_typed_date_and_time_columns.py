@@ -0,0 +1,123 @@
+"""Typed date and time columns for users, task_logs and daily_summaries
+
+Revision ID: b4d81f3e6a27
+Revises: a7e3c1d9f052
+Create Date: 2026-10-18 13:02:47.215530
+
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d81f3e6a27'
+down_revision = 'a7e3c1d9f052'
+branch_labels = None
+depends_on = None
+
+
+# Same storage as models.TimeOfDay: "HH:MM:SS" text on SQLite
+TIME_OF_DAY = sa.Time().with_variant(sqlite.TIME(storage_format="%(hour)02d:%(minute)02d:%(second)02d"), 'sqlite')
+
+# table -> [(column, kind, nullable after the upgrade)]
+TYPED_COLUMNS = {
+    'users': [('dob', 'date', True)],
+    'task_logs': [('date', 'date', False), ('time', 'time', True)],
+    'daily_summaries': [('date', 'date', False), ('latest_completion', 'time', True)],
+}
+
+
+def _normalize(kind, value):
+    """Returns the canonical "YYYY-MM-DD" / "HH:MM:SS" text of a stored value, or None if it does not parse."""
+    if value is None or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if kind == 'date':
+        try:
+            return date.fromisoformat(value[:10]).isoformat()
+        except ValueError:
+            return None
+    for time_format in ('%H:%M:%S', '%H:%M', '%H:%M:%S.%f'):
+        try:
+            return datetime.strptime(value, time_format).strftime('%H:%M:%S')
+        except ValueError:
+            continue
+    return None
+
+
+def _backfill(table, column, kind, nullable):
+    """Rewrites the column's text in canonical form; unparseable values become NULL where allowed."""
+    bind = op.get_bind()
+    rows = sa.table(table, sa.column('id', sa.Integer), sa.column(column, sa.String))
+    updates, invalid = [], []
+    for row_id, value in bind.execute(sa.select(rows.c.id, rows.c[column])):
+        normalized = _normalize(kind, value)
+        if normalized is None and value is not None and not nullable:
+            invalid.append(row_id)
+        elif normalized != value:
+            updates.append({'b_id': row_id, 'b_value': normalized})
+
+    if invalid and table == 'daily_summaries':
+        # Summaries are derived, `flask backfill-summaries` rebuilds them
+        bind.execute(rows.delete().where(rows.c.id.in_(invalid)))
+    elif invalid:
+        raise RuntimeError(f"{table}.{column} has values that are not dates in rows {invalid[:20]}; fix or delete them and rerun the upgrade")
+    if updates:
+        bind.execute(rows.update().where(rows.c.id == sa.bindparam('b_id')).values({column: sa.bindparam('b_value')}), updates)
+
+
+def _typed(kind):
+    return sa.Date() if kind == 'date' else TIME_OF_DAY
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, columns in TYPED_COLUMNS.items():
+        existing = {column['name']: column for column in inspector.get_columns(table)}
+        # create_app() runs db.create_all(), which may already have created typed columns
+        pending = [(name, kind, nullable) for name, kind, nullable in columns if isinstance(existing[name]['type'], sa.String)]
+        if not pending:
+            continue
+
+        if bind.dialect.name == 'sqlite':
+            # Rebuild the table from a copy with the new types. alter_column(type_=...) would copy the
+            # rows through CAST(... AS DATE), which SQLite evaluates numerically ("2024-05-01" -> 2024).
+            # The text is copied as is and normalized below.
+            copy = sa.Table(table, sa.MetaData(), autoload_with=bind)
+            for name, kind, nullable in pending:
+                copy.c[name].type = _typed(kind)
+                copy.c[name].nullable = nullable
+            with op.batch_alter_table(table, copy_from=copy, recreate='always'):
+                pass
+            for name, kind, nullable in pending:
+                _backfill(table, name, kind, nullable)
+        else:
+            # Values must parse before the USING cast, and empty dates of birth become NULL
+            for name, kind, nullable in pending:
+                if nullable and not existing[name]['nullable']:
+                    op.alter_column(table, name, nullable=True, existing_type=existing[name]['type'])
+                _backfill(table, name, kind, nullable)
+            for name, kind, nullable in pending:
+                op.alter_column(table, name, type_=_typed(kind), existing_type=existing[name]['type'],
+                                postgresql_using=f'"{name}"::{kind}')
+
+
+def downgrade():
+    # Columns stay nullable: users created by the legacy import may have no date of birth
+    bind = op.get_bind()
+    for table, columns in TYPED_COLUMNS.items():
+        if bind.dialect.name == 'sqlite':
+            # The values are already "YYYY-MM-DD" / "HH:MM:SS" text, only the declared types change
+            copy = sa.Table(table, sa.MetaData(), autoload_with=bind)
+            for name, kind, nullable in columns:
+                copy.c[name].type = sa.String(length=10 if kind == 'date' else 8)
+            with op.batch_alter_table(table, copy_from=copy, recreate='always'):
+                pass
+        else:
+            for name, kind, nullable in columns:
+                op.alter_column(table, name, type_=sa.String(length=10 if kind == 'date' else 8),
+                                existing_type=_typed(kind), postgresql_using=f'"{name}"::text')
@@ -0,0 +1,45 @@
+"""Add daily_summaries table
+
+Revision ID: c5d92e07a1f3
+Revises: 8e4a7d19c2b5
+Create Date: 2026-10-18 10:41:55.907126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d92e07a1f3'
+down_revision = '8e4a7d19c2b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may already have created the table
+    if 'daily_summaries' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('daily_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(length=10), nullable=False),
+        sa.Column('tasks_due', sa.Integer(), nullable=False),
+        sa.Column('tasks_done', sa.Integer(), nullable=False),
+        sa.Column('latest_completion', sa.String(length=8), nullable=True),
+        sa.Column('stars', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('daily_summaries', schema=None) as batch_op:
+        batch_op.create_index('ux_daily_summaries_user_date', ['user_id', 'date'], unique=True)
+
+    # Run `flask backfill-summaries` afterwards to build rows for existing task_logs
+
+
+def downgrade():
+    with op.batch_alter_table('daily_summaries', schema=None) as batch_op:
+        batch_op.drop_index('ux_daily_summaries_user_date')
+
+    op.drop_table('daily_summaries')
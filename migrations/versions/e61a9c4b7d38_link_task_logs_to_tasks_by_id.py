@@ -0,0 +1,67 @@
+"""Link task_logs to tasks by task_id
+
+Revision ID: e61a9c4b7d38
+Revises: b4d81f3e6a27
+Create Date: 2026-10-18 14:11:05.803162
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61a9c4b7d38'
+down_revision = 'b4d81f3e6a27'
+branch_labels = None
+depends_on = None
+
+
+def _column_names(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _index_names(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _foreign_key_names(table):
+    return {foreign_key['name'] for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table)}
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which creates the column and indexes on a fresh database
+    if 'task_id' not in _column_names('task_logs'):
+        with op.batch_alter_table('task_logs', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('task_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_task_logs_task_id_tasks', 'tasks', ['task_id'], ['id'], ondelete='SET NULL')
+
+    # Link each log to its user's task of the same name, the lowest id for duplicate names.
+    # Logs of tasks that were deleted or renamed before this revision keep task_id NULL.
+    op.execute(
+        "UPDATE task_logs SET task_id = "
+        "(SELECT MIN(tasks.id) FROM tasks WHERE tasks.user_id = task_logs.user_id AND tasks.task = task_logs.task) "
+        "WHERE task_id IS NULL"
+    )
+
+    # Names were unique per (user_id, date), so the linked ids are too
+    indexes = _index_names('task_logs')
+    with op.batch_alter_table('task_logs', schema=None) as batch_op:
+        if 'ux_task_logs_user_date_task' in indexes:
+            batch_op.drop_index('ux_task_logs_user_date_task')
+        if 'ux_task_logs_user_date_task_id' not in indexes:
+            batch_op.create_index('ux_task_logs_user_date_task_id', ['user_id', 'date', 'task_id'], unique=True)
+        if 'ix_task_logs_task_id' not in indexes:
+            batch_op.create_index('ix_task_logs_task_id', ['task_id'], unique=False)
+
+
+def downgrade():
+    # Fails if a renamed task now has two logs with different names on the same day
+    with op.batch_alter_table('task_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_logs_task_id')
+        batch_op.drop_index('ux_task_logs_user_date_task_id')
+        batch_op.create_index('ux_task_logs_user_date_task', ['user_id', 'date', 'task'], unique=True)
+        # Databases created by create_all before the model named the key have it unnamed;
+        # the table is rebuilt without the column either way, which drops the key with it
+        if 'fk_task_logs_task_id_tasks' in _foreign_key_names('task_logs'):
+            batch_op.drop_constraint('fk_task_logs_task_id_tasks', type_='foreignkey')
+        batch_op.drop_column('task_id')
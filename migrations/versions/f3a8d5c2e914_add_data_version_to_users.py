@@ -0,0 +1,31 @@
+"""Add data_version to users
+
+Revision ID: f3a8d5c2e914
+Revises: e61a9c4b7d38
+Create Date: 2026-10-18 15:02:41.906117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d5c2e914'
+down_revision = 'e61a9c4b7d38'
+branch_labels = None
+depends_on = None
+
+
+def _column_names(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'data_version' not in _column_names('users'):
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
@@ -1,5 +1,21 @@
+from datetime import datetime, timezone
 from extensions import db
 from sqlalchemy import Integer
+from sqlalchemy.dialects import sqlite
+from schedule import compile_schedule
+
+def utcnow():
+    # Naive UTC, as stored in the updated_at columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# Time of day to the second. SQLite keeps it as "HH:MM:SS" text (without the default
+# microseconds) so rows compare and sort correctly as strings and match older rows.
+TimeOfDay = db.Time().with_variant(sqlite.TIME(storage_format="%(hour)02d:%(minute)02d:%(second)02d"), 'sqlite')
+
+class DatabaseInfo(db.Model):
+    __tablename__ = 'database_info'
+    id = db.Column(db.Integer, primary_key=True)  # Single row with id 1
+    instance_id = db.Column(db.String(32), nullable=False)  # Random id given to the database when it was set up
 
 class Parent(db.Model):
     __tablename__ = 'parents'
@@ -13,25 +29,73 @@ class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    dob = db.Column(db.String(10), nullable=False)
+    dob = db.Column(db.Date, nullable=True)  # Empty for users created by the legacy import until a parent sets it
     ai_difficulty = db.Column(db.Integer, nullable=False, default=10)
     parent_id = db.Column(db.Integer, db.ForeignKey('parents.id'), nullable=False)
+    # Bumped by every write to the user's profile, tasks or logs; part of the rendered page cache keys
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Task(db.Model):
     __tablename__ = 'tasks'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     task = db.Column(db.String(200), nullable=False)
     frequency = db.Column(db.String(50), nullable=False)
     duration = db.Column(Integer, nullable=True)  # Duration in minutes, default is empty
     log_completed_page_numbers = db.Column(db.Boolean, nullable=False, default=False)  # Whether to log page numbers
+    updated_at = db.Column(db.DateTime, nullable=True, default=utcnow, onupdate=utcnow)  # UTC time of the last change
+
+    @property
+    def schedule(self):
+        # Compiled once per distinct frequency string and shared between tasks
+        return compile_schedule(self.frequency)
 
 class TaskLog(db.Model):
     __tablename__ = 'task_logs'
+    __table_args__ = (
+        # One log per task per day; also serves the (user_id, date) and user_id lookups
+        db.Index('ux_task_logs_user_date_task_id', 'user_id', 'date', 'task_id', unique=True),
+        # Lets deleting a task find its logs for ON DELETE SET NULL without a table scan
+        db.Index('ix_task_logs_task_id', 'task_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    task = db.Column(db.String(200), nullable=False)
-    date = db.Column(db.String(10), nullable=False)
+    # NULL once the task is deleted; the log keeps its name for history
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='SET NULL', name='fk_task_logs_task_id_tasks'), nullable=True)
+    task = db.Column(db.String(200), nullable=False)  # Task name when last logged
+    date = db.Column(db.Date, nullable=False)  # Pacific date
     status = db.Column(db.String(10), nullable=False)
-    time = db.Column(db.String(8), nullable=True)
+    time = db.Column(TimeOfDay, nullable=True)  # Pacific completion time
     completed_page_numbers = db.Column(db.String(200), nullable=True)  # Page numbers completed
+    updated_at = db.Column(db.DateTime, nullable=True, default=utcnow, onupdate=utcnow)  # UTC time of the last change
+
+    @property
+    def time_str(self):
+        # "HH:MM:SS" as shown on the pages and sent in JSON
+        return self.time.strftime("%H:%M:%S") if self.time else None
+
+class QuestionSet(db.Model):
+    __tablename__ = 'question_sets'
+    __table_args__ = (
+        db.Index('ix_question_sets_lookup', 'user', 'difficulty', 'date', 'timestamp'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user = db.Column(db.String(50), nullable=False)
+    difficulty = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.String(10), nullable=False)  # PST date the set was generated
+    timestamp = db.Column(db.String(19), nullable=False)  # PST "YYYY-MM-DD HH:MM:SS"
+    questions_html = db.Column(db.Text, nullable=False)
+    questions_and_hints = db.Column(db.Text, nullable=False)  # JSON-encoded list
+
+class DailySummary(db.Model):
+    __tablename__ = 'daily_summaries'
+    __table_args__ = (
+        db.Index('ux_daily_summaries_user_date', 'user_id', 'date', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    tasks_due = db.Column(db.Integer, nullable=False)  # Logged tasks plus due tasks without a log
+    tasks_done = db.Column(db.Integer, nullable=False)
+    latest_completion = db.Column(TimeOfDay, nullable=True)  # Latest completion time of the day
+    stars = db.Column(db.Integer, nullable=False)  # 2: all done before noon, 1: all done, 0: otherwise
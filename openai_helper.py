@@ -1,13 +1,20 @@
-import openai
-from config import OPENAI_API_KEY
-import os
 import json
-from datetime import datetime
+import logging
+import threading
+from instrumentation import openai_call
 from models import User, db  # Import User model and db session
-from timezone_utils import format_pst_date, now_pst
+from page_cache import bump_data_version
+from problem_cache import get_problem_cache
+from question_store import get_question_store, make_entry
+from singleflight import get_single_flight
+from timezone_utils import current_clock, format_pst_date
 
-# Initialize the OpenAI client
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
+
+# The openai SDK takes longer to import than the rest of the app, so it is only loaded
+# and the client created on the first call; benchmarks may assign a stand-in here
+client = None
+_client_lock = threading.Lock()
 
 problem_generation_prompt = """
 You are a creative educational assistant tasked with generating engaging, witty, and diverse math, logic, or science questions for kids. 
@@ -47,29 +54,107 @@ IMPORTANT:
 - The three questions should be diverse in topic and style, covering different areas of math, logic, or science.
 """
 
-QUESTIONS_LOG_FILE = os.path.join(os.path.dirname(__file__), 'data', 'questions_log.json')
+batch_problem_generation_prompt = """
+You are a creative educational assistant tasked with generating engaging, witty, and diverse math, logic, or science questions for kids. 
+To improve diversity, you can draw inspiration from various educational resources and examples from around the world.
+The difficulty levels should range from 0 to 20. 
+
+Generate {} questions for each of the following children, at their own age and difficulty:
+{}
+
+For each question, also provide a helpful hint that gives guidance without giving away the answer. 
+
+You MUST return your response as a valid JSON object with the following exact structure, with one entry per child in the order listed:
+
+{{
+  "sets": [
+    {{
+      "user": "The child's name exactly as listed",
+      "questions_html": "<ul><li>First question here</li><li>Second question here</li><li>Third question here</li></ul>",
+      "questions_and_hints": [
+        {{
+          "question": "First question here",
+          "hint": "A helpful hint for the first question"
+        }},
+        {{
+          "question": "Second question here", 
+          "hint": "A helpful hint for the second question"
+        }},
+        {{
+          "question": "Third question here",
+          "hint": "A helpful hint for the third question"
+        }}
+      ]
+    }}
+  ]
+}}
+
+IMPORTANT:
+- Return ONLY the JSON object, no additional text
+- Ensure the HTML in questions_html is valid and properly formatted
+- The questions in questions_html and questions_and_hints arrays must match exactly
+- Each hint should be brief, encouraging, and appropriate for that child's age
+- Do not share questions between children
+- Make sure the questions are appropriate for each child's age level
+- Each child's questions should be diverse in topic and style, covering different areas of math, logic, or science.
+"""
+
+ERROR_PROBLEMS_HTML = "<ul><li>Error fetching AI problems. Please try again later.</li></ul>"
+
+def get_client():
+    """
+    Returns the OpenAI client, importing the SDK and creating the client on first use.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                import openai
+                from config import OPENAI_API_KEY
+                client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return client
 
-def calculate_age(dob_string):
+def reset_client():
+    """
+    Drops the client so the next call creates a new one, e.g. in a forked worker
+    that must not share the parent's HTTP connections.
     """
-    Calculate the age from date of birth string.
+    global client
+    with _client_lock:
+        client = None
+
+def calculate_age(dob):
+    """
+    Calculate the age from a date of birth.
     Parameters:
-        dob_string (str): Date of birth in format "YYYY-MM-DD".
+        dob (date): Date of birth, e.g. User.dob.
     Returns:
-        int: Age in years, or None if dob_string is invalid.
+        int: Age in years on today's Pacific date, or None if dob is empty.
     """
-    try:
-        if not dob_string:
-            return None
-        dob = datetime.strptime(dob_string, "%Y-%m-%d")
-        today = datetime.now()
-        age = today.year - dob.year
-        # Adjust if birthday hasn't occurred this year
-        if today.month < dob.month or (today.month == dob.month and today.day < dob.day):
-            age -= 1
-        return age
-    except ValueError:
-        print(f"Invalid date format for DOB: {dob_string}")
+    if not dob:
         return None
+    today = current_clock().today
+    # One less if the birthday hasn't occurred yet this year
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+def get_user_age(user_name):
+    """
+    Reads the age of a specific user from their date of birth in the database.
+    Parameters:
+        user_name (str): Name of the user (e.g., "Dylan" or "Noah").
+    Returns:
+        int: Age in years, or 8 if the user or their DOB is not available.
+    """
+    user_obj = User.query.filter_by(name=user_name).first()
+    user_age = None
+    if user_obj and user_obj.dob:
+        user_age = calculate_age(user_obj.dob)
+
+    # Default age if not found or invalid
+    if user_age is None:
+        user_age = 8  # Default age if DOB is not available
+        logger.warning("Could not calculate age for user %s, using default age %s", user_name, user_age)
+    return user_age
 
 def get_user_difficulty(user_name):
     """
@@ -87,52 +172,76 @@ def get_user_difficulty(user_name):
 
 def fetch_ai_problems(num_questions=3, user="Dylan", difficulty=12, force_refresh=False):
     """
-    Fetches AI problems from OpenAI's API using the GPT-4o engine synchronously.
-    If questions for the same user, difficulty, and date already exist in the log, use the most recent one unless force_refresh is True.
+    Returns today's AI problem set, generating it with OpenAI's GPT-4o when needed.
+    The call blocks its caller until the set is ready, so pages reach it through the background
+    generator. If a set for the same user, difficulty, and date already exists in the store, the
+    most recent one is used unless force_refresh is True. Concurrent calls for the same key share
+    one generation (across worker processes with AI_SINGLE_FLIGHT=file), and the store is checked
+    again before the API is called so a set saved meanwhile is reused.
     Parameters:
         num_questions (int): Number of questions to generate.
         user (str): Name of the user (e.g., "Dylan" or "Noah").
         difficulty (int): Difficulty level of the questions (0-20).
-        force_refresh (bool): If True, bypass the cache and call OpenAI directly.
+        force_refresh (bool): If True, generate a new set instead of the stored one.
     Returns:
         dict: Dictionary with 'questions_html' and 'questions_and_hints' keys, or error structure if API call fails.
     """
     try:
-        # Get user's age from database
-        user_obj = User.query.filter_by(name=user).first()
-        user_age = None
-        if user_obj and user_obj.dob:
-            user_age = calculate_age(user_obj.dob)
-        
-        # Default age if not found or invalid
-        if user_age is None:
-            user_age = 8  # Default age if DOB is not available
-            print(f"Warning: Could not calculate age for user {user}, using default age {user_age}")
-
         # Check if questions for the same user, difficulty, and date already exist
         today = format_pst_date()
-        if not force_refresh and os.path.exists(QUESTIONS_LOG_FILE):
-            with open(QUESTIONS_LOG_FILE, 'r', encoding='utf-8') as json_file:
-                data = json.load(json_file)
-                # Filter entries for the same user, difficulty, and date
-                # Only look for entries with the new format (has 'questions_and_hints')
-                filtered_entries = [
-                    entry for entry in data
-                    if (entry['user'] == user and entry['difficulty'] == difficulty and 
-                        entry['timestamp'].startswith(today) and 'questions_and_hints' in entry)
-                ]
-                # Sort by timestamp in descending order to get the most recent entry
-                if filtered_entries:
-                    most_recent_entry = sorted(filtered_entries, key=lambda x: x['timestamp'], reverse=True)[0]
-                    print(f"Using most recent cached questions for {user} (age {user_age}) at difficulty {difficulty} from {today}")
-                    return {
-                        'questions_html': most_recent_entry['questions_html'],
-                        'questions_and_hints': most_recent_entry['questions_and_hints']
-                    }
-
-        # If no cached questions exist or force_refresh is True, call OpenAI API
-        prompt = problem_generation_prompt.format(num_questions, user, user_age, difficulty, user_age)
-        response = client.chat.completions.create(
+        if force_refresh:
+            get_problem_cache().invalidate(user, difficulty, today)
+        else:
+            cached = get_today_problem_set(user, difficulty, today)
+            if cached:
+                logger.debug("Using most recent cached questions for %s at difficulty %s from %s", user, difficulty, today)
+                return cached
+
+        # Concurrent callers for the same user, difficulty and day share one generation.
+        # After waiting on another process, reuse the set it saved; a forced refresh only
+        # reuses a set that differs from the one it was asked to replace.
+        replaced_id = get_question_store().latest_id(user, difficulty, today) if force_refresh else None
+
+        def reuse_saved_set():
+            entry = get_question_store().latest(user, difficulty, today)
+            if entry and entry['id'] != replaced_id:
+                problems_data = {
+                    'questions_html': entry['questions_html'],
+                    'questions_and_hints': entry['questions_and_hints']
+                }
+                get_problem_cache().put(user, difficulty, today, entry['id'], problems_data)
+                return problems_data
+            return None
+
+        return get_single_flight().do(
+            (user, difficulty, today),
+            lambda: generate_ai_problems(num_questions, user, difficulty),
+            recheck=reuse_saved_set
+        )
+    except Exception:
+        logger.exception("Error fetching AI problems for %s at difficulty %s", user, difficulty)
+        return {
+            'questions_html': ERROR_PROBLEMS_HTML,
+            'questions_and_hints': [{"question": "Error fetching problems", "hint": "Please try refreshing the page"}]
+        }
+
+def generate_ai_problems(num_questions, user, difficulty):
+    """
+    Calls OpenAI for a new problem set and saves it to the question store.
+    Parameters:
+        num_questions (int): Number of questions to generate.
+        user (str): Name of the user (e.g., "Dylan" or "Noah").
+        difficulty (int): Difficulty level of the questions (0-20).
+    Returns:
+        dict: Dictionary with 'questions_html' and 'questions_and_hints' keys, or error structure if the response is invalid.
+    """
+    # Get user's age from database
+    user_age = get_user_age(user)
+
+    # Call OpenAI API
+    prompt = problem_generation_prompt.format(num_questions, user, user_age, difficulty, user_age)
+    with openai_call('generate') as call:
+        response = call.response = get_client().chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a helpful and creative educational assistant. You must respond with valid JSON only."},
@@ -141,85 +250,183 @@ def fetch_ai_problems(num_questions=3, user="Dylan", difficulty=12, force_refres
             temperature=0.7,
             max_tokens=1000
         )
-        # Access the content of the first choice
-        response_content = response.choices[0].message.content.strip()
-
-        # Remove Markdown code block markers if present
-        if response_content.startswith("```json"):
-            response_content = response_content[7:]  # Remove the opening ```json
-        elif response_content.startswith("```"):
-            response_content = response_content[3:]  # Remove the opening ```
-        if response_content.endswith("```"):
-            response_content = response_content[:-3]  # Remove the closing ```
-
-        # Parse the JSON response
-        try:
-            problems_data = json.loads(response_content)
-            
-            # Validate the expected structure
-            if not isinstance(problems_data, dict) or 'questions_html' not in problems_data or 'questions_and_hints' not in problems_data:
-                raise ValueError("Response does not have expected structure")
-            
-            if not isinstance(problems_data['questions_and_hints'], list):
-                raise ValueError("questions_and_hints must be a list")
-                
-            # Validate each question and hint pair
-            for item in problems_data['questions_and_hints']:
-                if not isinstance(item, dict) or 'question' not in item or 'hint' not in item:
-                    raise ValueError("Each item in questions_and_hints must have 'question' and 'hint' keys")
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Error parsing JSON response: {e}")
-            print(f"Raw response: {response_content}")
-            return {
-                'questions_html': "<ul><li>Error fetching AI problems. Please try again later.</li></ul>",
-                'questions_and_hints': [{"question": "Error fetching problems", "hint": "Please try refreshing the page"}]
-            }
-
-        # Save the problems to the JSON log
-        save_questions_to_json(user, difficulty, problems_data)
+    # Access the content of the first choice
+    response_content = strip_code_fences(response.choices[0].message.content)
 
-        return problems_data
-    except Exception as e:
-        print(f"Error fetching AI problems: {e}")
+    # Parse the JSON response
+    try:
+        problems_data = json.loads(response_content)
+        validate_problems_data(problems_data)
+    except (json.JSONDecodeError, ValueError) as e:
+        logger.error("Error parsing JSON response: %s", e, extra={'raw_response': response_content})
         return {
-            'questions_html': "<ul><li>Error fetching AI problems. Please try again later.</li></ul>",
+            'questions_html': ERROR_PROBLEMS_HTML,
             'questions_and_hints': [{"question": "Error fetching problems", "hint": "Please try refreshing the page"}]
         }
 
-def save_questions_to_json(user, difficulty, problems_data):
+    # Save the problems to the question store; the cache picks them up with their entry id on the next read
+    save_questions(user, difficulty, problems_data)
+
+    return problems_data
+
+def fetch_ai_problems_batch(requests, num_questions=3):
     """
-    Saves the fetched questions and hints to a JSON file with metadata.
+    Generates today's problem sets for several children with a single OpenAI call.
+    Children that already have today's set get it back without being sent to the model, and
+    children whose set another request is generating are left out. Each child's set is
+    validated like a single-child response; sets that are missing or invalid are fetched again
+    with a per-user fetch_ai_problems call. Valid sets are saved under the child's single-flight
+    key, and dropped in favour of a set that was saved for the child during the model call.
     Parameters:
-        user (str): Name of the user (e.g., "Dylan" or "Noah").
-        difficulty (int): Difficulty level of the questions.
-        problems_data (dict): Dictionary containing questions_html and questions_and_hints.
+        requests (list): (user, age, difficulty) tuples, e.g. the children of one household.
+        num_questions (int): Number of questions per child.
+    Returns:
+        dict: Maps each user name to its problem set, or to the error structure if the fallback failed too.
     """
+    results = {}
+    today = format_pst_date()
+    single_flight = get_single_flight()
+    to_generate = []
+    for user, age, difficulty in requests:
+        if single_flight.running((user, difficulty, today)):
+            continue
+        problems_data = get_today_problem_set(user, difficulty, today)
+        if problems_data:
+            results[user] = problems_data
+        else:
+            to_generate.append((user, age, difficulty))
+
+    if not to_generate:
+        return results
+    if len(to_generate) == 1:
+        user, _, difficulty = to_generate[0]
+        results[user] = fetch_ai_problems(num_questions, user, difficulty)
+        return results
+
+    sets_by_user = {}
     try:
-        # Prepare the data to save
-        entry = {
-            "user": user,
-            "difficulty": difficulty,
-            "questions_html": problems_data['questions_html'],
-            "questions_and_hints": problems_data['questions_and_hints'],
-            "timestamp": now_pst().strftime("%Y-%m-%d %H:%M:%S")
+        children = "\n".join(f"- {user} (age {age}) at difficulty {difficulty}" for user, age, difficulty in to_generate)
+        prompt = batch_problem_generation_prompt.format(num_questions, children)
+        with openai_call('generate_batch') as call:
+            response = call.response = get_client().chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": "You are a helpful and creative educational assistant. You must respond with valid JSON only."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                max_tokens=1000 * len(to_generate)
+            )
+        response_content = strip_code_fences(response.choices[0].message.content)
+        sets = json.loads(response_content).get('sets')
+        if not isinstance(sets, list):
+            raise ValueError("sets must be a list")
+        sets_by_user = {entry.get('user'): entry for entry in sets if isinstance(entry, dict)}
+    except Exception:
+        logger.exception("Error fetching batched AI problems for %d children", len(to_generate))
+
+    for user, age, difficulty in to_generate:
+        problems_data = sets_by_user.get(user)
+        try:
+            validate_problems_data(problems_data)
+        except ValueError as e:
+            logger.warning("Batched problems for %s are not usable (%s), falling back to a single request", user, e)
+            results[user] = fetch_ai_problems(num_questions, user, difficulty)
+            continue
+
+        problems_data = {
+            'questions_html': problems_data['questions_html'],
+            'questions_and_hints': problems_data['questions_and_hints']
         }
 
-        # Load existing data from the JSON file
-        if os.path.exists(QUESTIONS_LOG_FILE):
-            with open(QUESTIONS_LOG_FILE, 'r', encoding='utf-8') as json_file:
-                data = json.load(json_file)
-        else:
-            data = []
+        def save_set():
+            save_questions(user, difficulty, problems_data)
+            return problems_data
+
+        results[user] = single_flight.do(
+            (user, difficulty, today),
+            save_set,
+            recheck=lambda: get_today_problem_set(user, difficulty, today)
+        )
+    return results
+
+def strip_code_fences(response_content):
+    """
+    Removes Markdown code block markers around a model response.
+    Parameters:
+        response_content (str): Raw message content.
+    Returns:
+        str: The content without surrounding ``` / ```json markers.
+    """
+    response_content = response_content.strip()
+    if response_content.startswith("```json"):
+        response_content = response_content[7:]  # Remove the opening ```json
+    elif response_content.startswith("```"):
+        response_content = response_content[3:]  # Remove the opening ```
+    if response_content.endswith("```"):
+        response_content = response_content[:-3]  # Remove the closing ```
+    return response_content
+
+def validate_problems_data(problems_data):
+    """
+    Checks that a parsed problem set has the structure the pages rely on.
+    Parameters:
+        problems_data (dict): Parsed problem set.
+    Raises:
+        ValueError: If the structure is not as expected.
+    """
+    if not isinstance(problems_data, dict) or 'questions_html' not in problems_data or 'questions_and_hints' not in problems_data:
+        raise ValueError("Response does not have expected structure")
 
-        # Append the new entry
-        data.append(entry)
+    if not isinstance(problems_data['questions_and_hints'], list):
+        raise ValueError("questions_and_hints must be a list")
 
-        # Save the updated data back to the JSON file
-        with open(QUESTIONS_LOG_FILE, 'w', encoding='utf-8') as json_file:
-            json.dump(data, json_file, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error saving questions to JSON file: {e}")
+    # Validate each question and hint pair
+    for item in problems_data['questions_and_hints']:
+        if not isinstance(item, dict) or 'question' not in item or 'hint' not in item:
+            raise ValueError("Each item in questions_and_hints must have 'question' and 'hint' keys")
+
+def get_today_problem_set(user, difficulty, today=None):
+    """
+    Returns today's most recent problem set for a user and difficulty.
+    The id of the latest question store entry is looked up first, and the in-process
+    cache serves the set if it holds that entry; the set is only read on a miss.
+    Parameters:
+        user (str): Name of the user (e.g., "Dylan" or "Noah").
+        difficulty (int): Difficulty level of the questions.
+        today (str): PST date "YYYY-MM-DD", defaults to the current PST date.
+    Returns:
+        dict: Dictionary with 'questions_html' and 'questions_and_hints' keys, or None if no set exists.
+    """
+    today = today or format_pst_date()
+    store = get_question_store()
+    entry_id = store.latest_id(user, difficulty, today)
+    if entry_id is None:
+        return None
+    cache = get_problem_cache()
+    problems_data = cache.get(user, difficulty, today, entry_id)
+    if problems_data is None:
+        most_recent_entry = store.latest(user, difficulty, today)
+        if most_recent_entry:
+            problems_data = {
+                'questions_html': most_recent_entry['questions_html'],
+                'questions_and_hints': most_recent_entry['questions_and_hints']
+            }
+            cache.put(user, difficulty, today, most_recent_entry['id'], problems_data)
+    return problems_data
+
+def save_questions(user, difficulty, problems_data):
+    """
+    Appends the fetched questions and hints to the question store with metadata.
+    Parameters:
+        user (str): Name of the user (e.g., "Dylan" or "Noah").
+        difficulty (int): Difficulty level of the questions.
+        problems_data (dict): Dictionary containing questions_html and questions_and_hints.
+    """
+    try:
+        get_question_store().append(make_entry(user, difficulty, problems_data))
+    except Exception:
+        logger.exception("Error saving questions to question store")
 
 def update_user_difficulty(user_name, new_difficulty):
     """
@@ -230,12 +437,12 @@ def update_user_difficulty(user_name, new_difficulty):
     """
     user = User.query.filter_by(name=user_name).first()
     if user:
-        print(f"Updating difficulty for user {user_name} from {user.ai_difficulty} to {new_difficulty}")
+        logger.info("Updating difficulty for user %s from %s to %s", user_name, user.ai_difficulty, new_difficulty)
         user.ai_difficulty = new_difficulty
+        bump_data_version([user.id])
         db.session.commit()
-        print(f"Difficulty updated successfully for user {user_name}")
     else:
-        print(f"User {user_name} not found in the database")
+        logger.warning("Cannot update difficulty, user %s not found", user_name)
 
 def get_hint_from_cache(user, difficulty, question_index):
     """
@@ -248,24 +455,12 @@ def get_hint_from_cache(user, difficulty, question_index):
         dict: Dictionary with 'question' and 'hint' keys, or None if not found.
     """
     try:
-        today = format_pst_date()
-        if os.path.exists(QUESTIONS_LOG_FILE):
-            with open(QUESTIONS_LOG_FILE, 'r', encoding='utf-8') as json_file:
-                data = json.load(json_file)
-                # Filter entries for the same user, difficulty, and date
-                # Only look for entries with the new format (has 'questions_and_hints')
-                filtered_entries = [
-                    entry for entry in data
-                    if (entry['user'] == user and entry['difficulty'] == difficulty and 
-                        entry['timestamp'].startswith(today) and 'questions_and_hints' in entry)
-                ]
-                # Sort by timestamp in descending order to get the most recent entry
-                if filtered_entries:
-                    most_recent_entry = sorted(filtered_entries, key=lambda x: x['timestamp'], reverse=True)[0]
-                    questions_and_hints = most_recent_entry['questions_and_hints']
-                    if 0 <= question_index < len(questions_and_hints):
-                        return questions_and_hints[question_index]
+        problems_data = get_today_problem_set(user, difficulty)
+        if problems_data:
+            questions_and_hints = problems_data['questions_and_hints']
+            if 0 <= question_index < len(questions_and_hints):
+                return questions_and_hints[question_index]
         return None
-    except Exception as e:
-        print(f"Error retrieving hint from cache: {e}")
+    except Exception:
+        logger.exception("Error retrieving hint from cache")
         return None
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Cache of rendered pages.
+The task, history and parent pages are cached as HTML under a key made of the page,
+its parameters, the Pacific date and the data_version of the users it shows. Every
+write to a user's tasks, logs or profile bumps users.data_version in the same
+transaction, so a repeat view of an unchanged page skips its queries and the
+template, and a changed page can never be served from the cache. Entries of old
+versions are never read again and age out through eviction. The key also holds the
+database's id (database.load_database_id), so a disk cache kept across restarts or
+shared by several processes is never read for a different database.
+
+Two backends are available, selected with the PAGE_CACHE config value:
+- "memory" (default): a per-process LRU of PAGE_CACHE_SIZE pages
+- "disk": one file per page in PAGE_CACHE_DIR, shared by the worker processes of
+  a host and evicted oldest first above PAGE_CACHE_MAX_BYTES
+- "none" turns caching off
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from flask import current_app, session
+
+from extensions import db
+from instrumentation import METRICS, measure_io
+from models import User
+from timezone_utils import current_clock
+
+PAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'page_cache')
+
+def bump_data_version(user_ids=None):
+    """
+    Marks the cached pages of users as stale, in the caller's transaction.
+    Parameters:
+        user_ids (iterable): IDs of the users whose data changed; all users when None.
+    """
+    stmt = db.update(User).values(data_version=User.data_version + 1)
+    if user_ids is not None:
+        user_ids = {int(user_id) for user_id in user_ids}
+        if not user_ids:
+            return
+        stmt = stmt.where(User.id.in_(user_ids))
+    db.session.execute(stmt, execution_options={"synchronize_session": False})
+
+class PageCache:
+    """
+    Interface shared by all page caches. Keys are hex digests, values rendered HTML.
+    """
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, page):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class MemoryPageCache(PageCache):
+    """
+    Bounded LRU of pages kept in the process.
+    Parameters:
+        maxsize (int): Maximum number of pages kept before the least recently used is evicted.
+    """
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        with self._lock:
+            self._entries[key] = page
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DiskPageCache(PageCache):
+    """
+    Keeps each page in its own file, written to a temporary file and renamed into place
+    so other processes never read a partial page. Reads refresh the file's mtime, and once
+    the directory grows past max_bytes the least recently used files are removed until it
+    is back under 90% of the limit.
+    Parameters:
+        path (str): Cache directory.
+        max_bytes (int): Size limit of the directory.
+    """
+    def __init__(self, path=PAGE_CACHE_DIR, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(size for _, _, size in self._files())
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.html')
+
+    def _files(self):
+        """Returns (mtime, path, size) of the cached pages, oldest first."""
+        files = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.html'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Evicted by another process
+                    continue
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        files.sort()
+        return files
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with measure_io('page_cache_read'), open(path, 'rb') as f:
+                page = f.read().decode('utf-8')
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return page
+
+    def set(self, key, page):
+        data = page.encode('utf-8')
+        with measure_io('page_cache_write'):
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._file(key))
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Other processes write to the same directory, so the running total is only an estimate
+        files = self._files()
+        self._size = sum(size for _, _, size in files)
+        target = self.max_bytes * 0.9
+        for _, path, size in files:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            for _, path, _ in self._files():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+def page_key(page, users, *parts):
+    """
+    Builds the cache key of a page.
+    Parameters:
+        page (str): Name of the page, e.g. "tasks".
+        users (list): The User rows the page shows; their ids and data versions are part of the key.
+        parts: Anything else the page depends on, e.g. request arguments.
+    Returns:
+        str: Hex digest of the key.
+    """
+    versions = tuple((user.id, user.data_version) for user in users)
+    key = (current_app.extensions.get('database_id'), page, versions, parts, current_clock().date)
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+def cached_page(page, key, render):
+    """
+    Returns the cached page for key, or renders, caches and returns it.
+    Pages are not cached while flashed messages are waiting, since those are shown only once.
+    Parameters:
+        page (str): Name of the page, for the hit/miss counters.
+        key (str): Key from page_key.
+        render (callable): Loads the page's data and renders it; only called on a miss.
+    Returns:
+        str: The rendered page.
+    """
+    cache = get_page_cache()
+    if cache is None or session.get('_flashes'):
+        return render()
+    html = cache.get(key)
+    if html is not None:
+        METRICS.inc('page_cache_requests_total', page=page, outcome='hit')
+        return html
+    METRICS.inc('page_cache_requests_total', page=page, outcome='miss')
+    html = render()
+    if not session.get('_flashes'):
+        cache.set(key, html)
+    return html
+
+def init_app(app):
+    """
+    Creates the page cache selected by the PAGE_CACHE config value.
+    """
+    backend = app.config.get('PAGE_CACHE', 'memory')
+    if backend == 'memory':
+        cache = MemoryPageCache(app.config.get('PAGE_CACHE_SIZE', 512))
+    elif backend == 'disk':
+        # Kept across restarts and shared by the workers; keys include the database id
+        cache = DiskPageCache(app.config.get('PAGE_CACHE_DIR', PAGE_CACHE_DIR),
+                              app.config.get('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    elif backend == 'none':
+        cache = None
+    else:
+        raise ValueError(f"Unknown PAGE_CACHE backend: {backend}")
+    app.extensions['page_cache'] = cache
+
+def get_page_cache():
+    """
+    Returns the page cache of the current app, or None when caching is off.
+    """
+    return current_app.extensions.get('page_cache')
@@ -0,0 +1,101 @@
+"""
+In-process cache of today's AI problem sets.
+Parsed sets are kept per (user, difficulty, PST date) with LRU eviction and expire
+at the Pacific midnight that ends their date. Each set is tagged with the id of its
+question store entry and only served while that entry is still the latest one, so
+page views and hint clicks check one indexed id instead of reading and parsing the
+set, and a refresh saved by another worker process is picked up on the next request.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from timezone_utils import next_pst_midnight
+
+class ProblemSetCache:
+    """
+    Bounded LRU cache of problem sets with hit/miss counters.
+    Parameters:
+        maxsize (int): Maximum number of sets kept before the least recently used is evicted.
+        max_age (int): Optional lifetime in seconds, on top of the Pacific-midnight expiry.
+    """
+    def __init__(self, maxsize=256, max_age=None):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._entries = OrderedDict()  # (user, difficulty, date) -> (expires_at, entry_id, problems_data)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expires_at(self, date):
+        expires_at = next_pst_midnight(date).timestamp()
+        if self.max_age:
+            expires_at = min(expires_at, time.time() + self.max_age)
+        return expires_at
+
+    def get(self, user, difficulty, date, entry_id):
+        """
+        Returns the cached set if it was saved as the question store entry entry_id, else None.
+        """
+        key = (user, difficulty, date)
+        with self._lock:
+            found = self._entries.get(key)
+            if found is not None and found[0] > time.time() and found[1] == entry_id:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return found[2]
+            if found is not None:
+                # Expired, or replaced by a newer set in the store
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, user, difficulty, date, entry_id, problems_data):
+        key = (user, difficulty, date)
+        with self._lock:
+            self._entries[key] = (self._expires_at(date), entry_id, problems_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user, difficulty=None, date=None):
+        """
+        Drops the cached sets of a user, optionally only for one difficulty and/or date.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == user and difficulty in (None, key[1]) and date in (None, key[2]):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+def init_app(app):
+    """
+    Creates the problem set cache sized by the AI_PROBLEM_CACHE_SIZE config value.
+    """
+    app.extensions['problem_cache'] = ProblemSetCache(
+        maxsize=app.config.get('AI_PROBLEM_CACHE_SIZE', 256),
+        max_age=app.config.get('AI_PROBLEM_CACHE_MAX_AGE')
+    )
+
+def get_problem_cache():
+    """
+    Returns the problem set cache of the current app.
+    """
+    return current_app.extensions['problem_cache']
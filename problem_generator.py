@@ -0,0 +1,234 @@
+"""
+Background generation of AI problem sets.
+Model calls run on a small worker pool instead of inside Flask requests. The pool
+starts with the first job, so a gunicorn master that preloads the app never runs
+one. Every user's daily set is queued shortly after Pacific midnight by
+`flask prefetch-problems` from cron, or by a prefetch thread under the development server.
+Pages serve the cached set straight away, or a "generating" placeholder that
+polls /ai_problems/status until the set is ready. Whether a set is generating or
+failed comes from the single-flight group, so every worker process reports the same
+state for a job, whichever process runs it.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from models import User
+from openai_helper import ERROR_PROBLEMS_HTML, fetch_ai_problems, fetch_ai_problems_batch, get_today_problem_set, get_user_age
+from timezone_utils import format_pst_date, next_pst_midnight
+
+logger = logging.getLogger(__name__)
+
+class ProblemGenerator:
+    """
+    Runs fetch_ai_problems on a thread pool, at most one job per (user, difficulty, date)
+    in this process; jobs another process is running are not queued again.
+    Parameters:
+        app (Flask): App whose context the jobs run in.
+        max_workers (int): Number of concurrent model calls.
+        prefetch_delay (int): Seconds after Pacific midnight to start the daily prefetch.
+        batch_size (int): Maximum number of children whose sets are generated in one model call.
+    """
+    def __init__(self, app, max_workers=2, prefetch_delay=300, batch_size=4):
+        self.app = app
+        self.max_workers = max_workers
+        self.prefetch_delay = prefetch_delay
+        self.batch_size = batch_size
+        self._executor = None  # Started by the first job
+        self._lock = threading.Lock()
+        self._pending = {}  # (user, difficulty, date) -> Future
+        self._forced = set()  # Keys whose pending job is a forced refresh
+        self._refresh_next = set()  # Keys to refresh once their pending job is done
+        self._stop = threading.Event()
+        self._prefetch_thread = None
+
+    def _submit(self, fn, *args):
+        # Called with self._lock held
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ai-problems')
+        return self._executor.submit(fn, *args)
+
+    @property
+    def single_flight(self):
+        return self.app.extensions['single_flight']
+
+    def request(self, user, difficulty, force_refresh=False):
+        """
+        Queues generation of today's set unless a job for it is already running,
+        here or (except for a forced refresh) in another process. A forced refresh
+        requested while a regular job is pending here runs once that job is done. Pages
+        show the placeholder rather than the old set while a job is pending or running.
+        Returns:
+            bool: True if a new job was queued.
+        """
+        key = (user, difficulty, format_pst_date())
+        with self._lock:
+            if key in self._pending:
+                if not force_refresh or key in self._forced:
+                    return False
+                self._refresh_next.add(key)
+                return True
+            if not force_refresh and self.single_flight.running(key):
+                return False
+            self._queue(key, force_refresh)
+            return True
+
+    def _queue(self, key, force_refresh):
+        # Called with self._lock held
+        self.single_flight.clear_failed(key)
+        if force_refresh:
+            self._forced.add(key)
+        self._pending[key] = self._submit(self._run, key, force_refresh)
+
+    def _finish(self, key):
+        # Called with self._lock held when the job for key is done
+        self._pending.pop(key, None)
+        self._forced.discard(key)
+        if key in self._refresh_next:
+            self._refresh_next.discard(key)
+            self._queue(key, True)
+
+    def _run(self, key, force_refresh):
+        user, difficulty, _ = key
+        try:
+            with self.app.app_context():
+                problems_data = fetch_ai_problems(3, user, difficulty, force_refresh=force_refresh)
+            if problems_data.get('questions_html') == ERROR_PROBLEMS_HTML:
+                self.single_flight.mark_failed(key)
+        finally:
+            with self._lock:
+                self._finish(key)
+
+    def status(self, user, difficulty):
+        """
+        Returns "generating", "failed", "ready" or "missing" for today's set.
+        "missing" can also mean a job is queued in another process but has not started yet.
+        Needs an app context when the set has to be looked up.
+        """
+        key = (user, difficulty, format_pst_date())
+        with self._lock:
+            if key in self._pending:
+                return "generating"
+        if self.single_flight.running(key):
+            return "generating"
+        if self.single_flight.failed(key):
+            return "failed"
+        return "ready" if get_today_problem_set(user, difficulty) else "missing"
+
+    def clear_failure(self, user, difficulty):
+        self.single_flight.clear_failed((user, difficulty, format_pst_date()))
+
+    def request_batch(self, requests):
+        """
+        Queues one batched job for several (user, age, difficulty) requests.
+        Users that already have a job running, here or in another process, are left out.
+        Returns:
+            int: Number of users included in the job.
+        """
+        today = format_pst_date()
+        with self._lock:
+            requests = [r for r in requests
+                        if (r[0], r[2], today) not in self._pending and not self.single_flight.running((r[0], r[2], today))]
+            if not requests:
+                return 0
+            future = self._submit(self._run_batch, requests, today)
+            for user, _, difficulty in requests:
+                self.single_flight.clear_failed((user, difficulty, today))
+                self._pending[(user, difficulty, today)] = future
+            return len(requests)
+
+    def _run_batch(self, requests, today):
+        try:
+            with self.app.app_context():
+                results = fetch_ai_problems_batch(requests)
+            for user, _, difficulty in requests:
+                if results.get(user, {}).get('questions_html') == ERROR_PROBLEMS_HTML:
+                    self.single_flight.mark_failed((user, difficulty, today))
+        finally:
+            with self._lock:
+                for user, _, difficulty in requests:
+                    self._finish((user, difficulty, today))
+
+    def prefetch_all(self):
+        """
+        Queues today's set for every user at their current difficulty,
+        batching the children of each parent into as few model calls as possible.
+        """
+        with self.app.app_context():
+            households = {}
+            for user in User.query.order_by(User.parent_id, User.id).all():
+                difficulty = max(1, min(20, user.ai_difficulty or 10))
+                if get_today_problem_set(user.name, difficulty) is None:
+                    age = get_user_age(user.name)
+                    households.setdefault(user.parent_id, []).append((user.name, age, difficulty))
+        queued = 0
+        for children in households.values():
+            for i in range(0, len(children), self.batch_size):
+                queued += self.request_batch(children[i:i + self.batch_size])
+        logger.info("Queued background generation of %d AI problem sets", queued)
+        return queued
+
+    def _prefetch_loop(self):
+        while not self._stop.is_set():
+            wake_at = next_pst_midnight().timestamp() + self.prefetch_delay
+            if self._stop.wait(max(0, wake_at - time.time())):
+                break
+            try:
+                self.prefetch_all()
+            except Exception:
+                logger.exception("Error prefetching AI problems")
+
+    def start_prefetch(self):
+        """
+        Starts the daily prefetch thread. Only for a single long-running process such as the
+        development server; gunicorn deployments run `flask prefetch-problems` from cron.
+        """
+        if self._prefetch_thread is None:
+            self._prefetch_thread = threading.Thread(target=self._prefetch_loop, name='ai-prefetch', daemon=True)
+            self._prefetch_thread.start()
+
+    def shutdown(self, wait=False):
+        """
+        Stops the prefetch thread and the pool; with wait, returns once the queued jobs are done.
+        """
+        self._stop.set()
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def after_fork(self):
+        """
+        Starts over in a worker forked from the process that created the generator. Nothing
+        should have run there, but any pool, jobs or prefetch thread of the parent did not survive
+        the fork; the worker starts its own pool with its first job.
+        """
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._forced = set()
+        self._refresh_next = set()
+        self._stop = threading.Event()
+        self._prefetch_thread = None
+
+def init_app(app):
+    """
+    Creates the background generator. No threads start here: the pool starts with the first
+    job and the daily prefetch thread only when start_prefetch() is called.
+    """
+    generator = ProblemGenerator(
+        app,
+        max_workers=app.config.get('AI_GENERATION_WORKERS', 2),
+        prefetch_delay=app.config.get('AI_PREFETCH_DELAY', 300),
+        batch_size=app.config.get('AI_BATCH_SIZE', 4)
+    )
+    app.extensions['problem_generator'] = generator
+
+def get_problem_generator():
+    """
+    Returns the background generator of the current app.
+    """
+    return current_app.extensions['problem_generator']
@@ -0,0 +1,242 @@
+"""
+Storage for AI-generated question sets.
+Sets are appended once and looked up by (user, difficulty, PST date), so neither
+saving a new set nor finding today's set has to read the whole history.
+
+Two backends are available, selected with the QUESTION_STORE config value:
+- "sql" (default): rows in the question_sets table of the app database
+- "jsonl": an append-only JSON Lines file with an in-memory offset index
+"""
+import json
+import os
+import threading
+
+from flask import current_app
+
+from extensions import db
+from models import QuestionSet
+from instrumentation import measure_io
+from timezone_utils import now_pst
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+QUESTIONS_LOG_FILE = os.path.join(DATA_DIR, 'questions_log.json')  # Legacy single-document log
+QUESTIONS_JSONL_FILE = os.path.join(DATA_DIR, 'questions_log.jsonl')
+
+def make_entry(user, difficulty, problems_data, timestamp=None):
+    """
+    Builds a question log entry in the same shape as the legacy JSON log.
+    Parameters:
+        user (str): Name of the user (e.g., "Dylan" or "Noah").
+        difficulty (int): Difficulty level of the questions.
+        problems_data (dict): Dictionary containing questions_html and questions_and_hints.
+        timestamp (str): PST timestamp "YYYY-MM-DD HH:MM:SS", defaults to now.
+    Returns:
+        dict: The entry.
+    """
+    return {
+        "user": user,
+        "difficulty": difficulty,
+        "questions_html": problems_data['questions_html'],
+        "questions_and_hints": problems_data['questions_and_hints'],
+        "timestamp": timestamp or now_pst().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+class QuestionStore:
+    """
+    Interface shared by all question stores.
+    """
+    def append(self, entry):
+        raise NotImplementedError
+
+    def append_many(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def latest(self, user, difficulty, date):
+        """
+        Returns the most recent entry for the user, difficulty and PST date ("YYYY-MM-DD"), or None.
+        The entry carries the store's "id" for it, as returned by latest_id().
+        """
+        raise NotImplementedError
+
+    def latest_id(self, user, difficulty, date):
+        """
+        Returns the id of the most recent entry for the user, difficulty and PST date without
+        reading the entry, or None. A new id means a newer set was saved, by any process.
+        """
+        raise NotImplementedError
+
+class SQLQuestionStore(QuestionStore):
+    """
+    Keeps question sets in the question_sets table, indexed on (user, difficulty, date, timestamp).
+    """
+    @staticmethod
+    def _to_row(entry):
+        return {
+            "user": entry['user'],
+            "difficulty": entry['difficulty'],
+            "date": entry['timestamp'][:10],
+            "timestamp": entry['timestamp'],
+            "questions_html": entry['questions_html'],
+            "questions_and_hints": json.dumps(entry['questions_and_hints'], ensure_ascii=False)
+        }
+
+    def append(self, entry):
+        db.session.add(QuestionSet(**self._to_row(entry)))
+        db.session.commit()
+
+    def append_many(self, entries):
+        rows = [self._to_row(entry) for entry in entries]
+        if rows:
+            db.session.execute(db.insert(QuestionSet), rows)
+            db.session.commit()
+
+    def latest(self, user, difficulty, date):
+        row = (QuestionSet.query
+               .filter_by(user=user, difficulty=difficulty, date=date)
+               .order_by(QuestionSet.timestamp.desc(), QuestionSet.id.desc())
+               .first())
+        if not row:
+            return None
+        return {
+            "id": row.id,
+            "user": row.user,
+            "difficulty": row.difficulty,
+            "questions_html": row.questions_html,
+            "questions_and_hints": json.loads(row.questions_and_hints),
+            "timestamp": row.timestamp
+        }
+
+    def latest_id(self, user, difficulty, date):
+        # Answered from ix_question_sets_lookup, which includes the rowid on SQLite
+        return (db.session.query(QuestionSet.id)
+                .filter_by(user=user, difficulty=difficulty, date=date)
+                .order_by(QuestionSet.timestamp.desc(), QuestionSet.id.desc())
+                .limit(1)
+                .scalar())
+
+class JsonlQuestionStore(QuestionStore):
+    """
+    Appends one JSON object per line and keeps a dict of
+    (user, difficulty, date) -> (timestamp, byte offset) for the latest line of each key.
+    The index is built from the file once, then only the lines added since the last
+    read are scanned, which also picks up entries written by other processes.
+    An entry's id is the byte offset of its line.
+    """
+    def __init__(self, path=QUESTIONS_JSONL_FILE):
+        self.path = path
+        self._index = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _catch_up(self):
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        if size < self._offset:
+            # File was truncated or replaced, rebuild the index
+            self._index = {}
+            self._offset = 0
+        if size == self._offset:
+            return
+        with measure_io('jsonl_scan'), open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written line, pick it up next time
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    self._offset += len(line)
+                    continue
+                key = (entry['user'], entry['difficulty'], entry['timestamp'][:10])
+                current = self._index.get(key)
+                if current is None or entry['timestamp'] >= current[0]:
+                    self._index[key] = (entry['timestamp'], self._offset)
+                self._offset += len(line)
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        lines = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+        if not lines:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with measure_io('jsonl_append'), open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self._catch_up()
+
+    def latest(self, user, difficulty, date):
+        with self._lock:
+            self._catch_up()
+            found = self._index.get((user, difficulty, date))
+            if found is None:
+                return None
+            with measure_io('jsonl_read'), open(self.path, 'rb') as f:
+                f.seek(found[1])
+                entry = json.loads(f.readline())
+            entry['id'] = found[1]
+            return entry
+
+    def latest_id(self, user, difficulty, date):
+        # The byte offset of the line identifies the entry
+        with self._lock:
+            self._catch_up()
+            found = self._index.get((user, difficulty, date))
+            return found[1] if found is not None else None
+
+def init_app(app):
+    """
+    Creates the question store selected by the QUESTION_STORE config value.
+    """
+    backend = app.config.get('QUESTION_STORE', 'sql')
+    if backend == 'jsonl':
+        store = JsonlQuestionStore(app.config.get('QUESTION_STORE_PATH', QUESTIONS_JSONL_FILE))
+    elif backend == 'sql':
+        store = SQLQuestionStore()
+    else:
+        raise ValueError(f"Unknown QUESTION_STORE backend: {backend}")
+    app.extensions['question_store'] = store
+
+def get_question_store():
+    """
+    Returns the question store of the current app.
+    """
+    return current_app.extensions['question_store']
+
+def import_legacy_json(store, path=QUESTIONS_LOG_FILE, batch_size=500):
+    """
+    One-shot import of the legacy questions_log.json into a question store.
+    Entries without 'questions_and_hints' (the old format) are skipped since they were never served.
+    The legacy file is renamed to *.imported afterwards so the import is not repeated.
+    Parameters:
+        store (QuestionStore): Destination store.
+        path (str): Path of the legacy JSON file.
+        batch_size (int): Number of entries appended per batch.
+    Returns:
+        tuple: (imported, skipped) counts.
+    """
+    if not os.path.exists(path):
+        return 0, 0
+    with measure_io('legacy_json_load'), open(path, 'r', encoding='utf-8') as json_file:
+        data = json.load(json_file)
+
+    imported = skipped = 0
+    batch = []
+    for entry in data:
+        if 'questions_and_hints' not in entry or 'timestamp' not in entry:
+            skipped += 1
+            continue
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            store.append_many(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        store.append_many(batch)
+        imported += len(batch)
+
+    os.replace(path, path + '.imported')
+    return imported, skipped
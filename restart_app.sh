@@ -1,15 +1,35 @@
 #!/bin/bash
 
+cd "$(dirname "$0")"
+PYTHON_BIN=/home/ec2-user/miniconda3/envs/py313/bin
+PIDFILE=logs/gunicorn.pid
+
 echo "Stopping any running Flask app..."
-# Kill any python process running app.py
+# Gunicorn master from gunicorn.conf.py: TERM lets the workers finish their requests (GUNICORN_GRACEFUL_TIMEOUT)
+if [ -f "$PIDFILE" ] && kill -0 "$(cat "$PIDFILE")" 2>/dev/null; then
+    kill -TERM "$(cat "$PIDFILE")"
+    for _ in $(seq 1 35); do
+        [ -f "$PIDFILE" ] || break
+        sleep 1
+    done
+fi
+# Development server started with python app.py
 pkill -f app.py
 
 # Optional: small delay to ensure processes are stopped
 sleep 2
 
-echo "Starting Flask app..."
-# Start Flask with nohup in background
-nohup /home/ec2-user/miniconda3/envs/py313/bin/python app.py &
+# Keep the worker logs of the last run only; every worker rotates its own file, but the files
+# of exited workers would otherwise stay forever
+mkdir -p logs/previous
+rm -f logs/previous/app.*.log*
+mv logs/app.*.log* logs/previous/ 2>/dev/null
 
-echo "Flask app restarted. Logs are in nohup.out"
+echo "Starting Flask app..."
+# Worker, thread and keep-alive settings are in gunicorn.conf.py and can be overridden with GUNICORN_* variables.
+# Each worker writes JSON line logs to logs/app.<pid>.log and rotates them itself (LOG_MAX_BYTES, LOG_BACKUP_COUNT).
+# Gunicorn's own messages and output from before logging starts (e.g. import errors) go to logs/console.log,
+# which is replaced on each restart.
+nohup "$PYTHON_BIN/gunicorn" wsgi:app > logs/console.log 2>&1 &
 
+echo "Flask app restarted. Logs are in logs/app.<pid>.log"
@@ -2,3 +2,6 @@ from .home import bp as home
 from .tasks import bp as tasks
 from .history import bp as history
 from .parent import bp as parent
+from .api import bp as api
+from .live import bp as live
+from .export import bp as export
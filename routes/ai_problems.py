@@ -1,29 +1,53 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from openai_helper import fetch_ai_problems, get_user_difficulty, update_user_difficulty, get_hint_from_cache
+import logging
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from openai_helper import ERROR_PROBLEMS_HTML, get_user_difficulty, update_user_difficulty, get_hint_from_cache, get_today_problem_set
 from datetime import date
 from models import User
-from timezone_utils import now_pst, format_pst_date
+from problem_cache import get_problem_cache
+from problem_generator import get_problem_generator
+from timezone_utils import current_clock, format_pst_date
 
 ai_problems_bp = Blueprint('ai_problems', __name__, url_prefix='/ai_problems')
+logger = logging.getLogger(__name__)
 
 @ai_problems_bp.route('/')
 def ai_problems():
     # Fetch AI problems and user difficulty
     user = request.args.get('user') or session.get('user', 'Guest')  # Check query parameters first, then session
-    today = now_pst().strftime('%B %d, %Y')
+    today = current_clock().now.strftime('%B %d, %Y')
+
+    generating = False
 
     try:
         difficulty = get_user_difficulty(user)
-        problems_data = fetch_ai_problems(3, user, difficulty)
-        # Extract the HTML for backward compatibility with template
-        problems = problems_data.get('questions_html', '<ul><li>Error loading problems</li></ul>')
-    except Exception as e:
+        generator = get_problem_generator()
+        status = generator.status(user, difficulty)
+        problems_data = get_today_problem_set(user, difficulty) if status == 'ready' else None
+        if problems_data:
+            # Extract the HTML for backward compatibility with template
+            problems = problems_data.get('questions_html', '<ul><li>Error loading problems</li></ul>')
+        elif status == 'failed':
+            # Show the error once; reloading the page queues a new attempt
+            generator.clear_failure(user, difficulty)
+            problems = ERROR_PROBLEMS_HTML
+        else:
+            # Generate in the background and let the page poll instead of blocking on the model call
+            generator.request(user, difficulty)
+            generating = True
+            problems = ''
+    except Exception:
+        logger.exception("Error fetching AI problems or difficulty for %s", user)
         difficulty = 10  # Default to 10 instead of None
         problems = '<ul><li>Error loading problems</li></ul>'
-        # Could add proper logging here if needed
-        # print(f"Error fetching AI problems or difficulty: {e}")
 
-    return render_template('ai_problems.html', ai_problems=problems, difficulty=difficulty, user=user, today=today)
+    return render_template('ai_problems.html', ai_problems=problems, difficulty=difficulty, user=user, today=today, generating=generating)
+
+@ai_problems_bp.route('/status')
+def generation_status():
+    """Report whether today's problem set for a user is ready, still generating or failed"""
+    user = request.args.get('user') or session.get('user', 'Guest')
+    difficulty = get_user_difficulty(user)
+    return jsonify({'status': get_problem_generator().status(user, difficulty)})
 
 @ai_problems_bp.route('/get_hint', methods=['POST'])
 def get_hint():
@@ -38,6 +62,12 @@ def get_hint():
 
     # Get difficulty and retrieve hint from cache
     difficulty = get_user_difficulty(user_name)
+    problems_data = get_today_problem_set(user_name, difficulty)
+    if not problems_data:
+        # Today's set is not generated yet, the problems page will show the placeholder
+        flash("Hint not available! Please refresh the questions and try again.", "error")
+        return redirect(url_for('ai_problems.ai_problems', user=user_name))
+
     hint_data = get_hint_from_cache(user_name, difficulty, question_id)
     
     if hint_data:
@@ -48,8 +78,7 @@ def get_hint():
         hint = "Sorry, hint not available right now. Try refreshing the page!"
         question = "Question not found"
 
-    # Fetch AI problems again to pass to the template
-    problems_data = fetch_ai_problems(3, user_name, difficulty)
+    # Pass today's problems to the template as well
     ai_problems = problems_data.get('questions_html', '<ul><li>Error loading problems</li></ul>')
 
     # Return the hint along with AI problems
@@ -59,7 +88,7 @@ def get_hint():
 def refresh_questions():
     user = request.form.get('user', 'default_user')  # Replace with actual user logic
     difficulty = get_user_difficulty(user)
-    fetch_ai_problems(3, user, difficulty, force_refresh=True)
+    get_problem_generator().request(user, difficulty, force_refresh=True)
     return redirect(url_for('ai_problems.ai_problems', user=user))
 
 @ai_problems_bp.route('/difficulty', methods=['POST'])
@@ -82,5 +111,12 @@ def change_difficulty():
             new_difficulty = current_difficulty
 
         update_user_difficulty(user, new_difficulty)
+        # Start generating the set for the new level before the page asks for it
+        get_problem_generator().request(user, new_difficulty)
 
     return redirect(url_for('ai_problems.ai_problems', user=user))
+
+@ai_problems_bp.route('/cache_stats')
+def cache_stats():
+    """Report hit/miss counters of the in-process problem set cache"""
+    return jsonify(get_problem_cache().stats())
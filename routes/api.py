@@ -0,0 +1,128 @@
+"""
+JSON API for tasks and logs.
+GET responses carry an ETag built from the user's data_version, which every write to
+their tasks, logs or profile bumps (deletes included), so polling clients get
+304 Not Modified without the task list or history being rebuilt. There is no
+Last-Modified: no timestamp moves when rows are deleted, and If-Modified-Since
+alone would then keep answering 304.
+"""
+import hashlib
+import json
+from datetime import date as Date
+
+from flask import Blueprint, current_app, jsonify, request, session
+
+from models import Task, User
+from routes.home import session_can_access
+from routes.history import load_history_page, parse_history_window
+from routes.tasks import load_tasks_for_user, log_task_status
+from timezone_utils import current_clock
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+def conditional_json(key, user, build):
+    """
+    Returns 304 when the client's ETag still matches, otherwise the JSON built by `build`.
+    Parameters:
+        key (tuple): Request parameters the response depends on.
+        user (User): The user whose data the response shows; their data_version is the validator.
+        build (callable): Produces the JSON-serializable body; only called on a miss.
+    """
+    etag = hashlib.sha1(repr((key, user.id, user.data_version)).encode('utf-8')).hexdigest()
+    response = current_app.response_class(mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Clients revalidate on every poll
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    response.set_data(json.dumps(build()))
+    return response
+
+def api_user(user_id):
+    """
+    Returns (user, None) for a logged-in client allowed to see the user (themselves or a
+    child of the same parent), or (None, error response).
+    """
+    if 'user_id' not in session:
+        return None, (jsonify({'error': 'Not logged in'}), 401)
+    user = User.query.get(user_id)
+    if not user:
+        return None, (jsonify({'error': 'User not found'}), 404)
+    if not session_can_access(user):
+        return None, (jsonify({'error': 'Not allowed to access this user'}), 403)
+    return user, None
+
+@bp.route('/users/<int:user_id>/tasks', methods=['GET'])
+def get_tasks(user_id):
+    """Tasks due on ?date= (default today) with their status for that date"""
+    user, error = api_user(user_id)
+    if error:
+        return error
+
+    date = current_clock().today
+    if request.args.get('date'):
+        try:
+            date = Date.fromisoformat(request.args['date'])
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    return conditional_json(
+        ('tasks', date), user,
+        lambda: {'user': user.name, 'date': date.isoformat(), 'tasks': load_tasks_for_user(user_id, date)}
+    )
+
+@bp.route('/users/<int:user_id>/tasks/<int:task_id>/status', methods=['PATCH'])
+def set_task_status(user_id, task_id):
+    """
+    Sets today's status of a task.
+    Body: {"status": "Done" | "TODO", "page_numbers": optional string}
+    """
+    user, error = api_user(user_id)
+    if error:
+        return error
+
+    task = Task.query.filter_by(id=task_id, user_id=user_id).first()
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    if status not in ('Done', 'TODO'):
+        return jsonify({'error': 'status must be "Done" or "TODO"'}), 400
+
+    page_numbers = data.get('page_numbers')
+    if page_numbers is not None and not isinstance(page_numbers, str):
+        return jsonify({'error': 'page_numbers must be a string'}), 400
+    if status == 'TODO':
+        page_numbers = ''  # Unmarking clears the recorded pages, as on the tasks page
+    log = log_task_status(user_id, task, status, page_numbers.strip() if page_numbers else page_numbers)
+
+    return jsonify({
+        'id': task.id,
+        'task': task.task,
+        'date': log.date.isoformat(),
+        'status': log.status,
+        'time': log.time_str if log.status == 'Done' else None,
+        'completed_page_numbers': log.completed_page_numbers
+    })
+
+@bp.route('/users/<int:user_id>/history', methods=['GET'])
+def get_history(user_id):
+    """One page of history; ?before=YYYY-MM-DD&days=N as on /history.json"""
+    user, error = api_user(user_id)
+    if error:
+        return error
+
+    before, days = parse_history_window(request.args)
+
+    def build():
+        grouped, sorted_dates, date_stars, next_before = load_history_page(user_id, before, days)
+        return {
+            'dates': [
+                {'date': date.isoformat(), 'stars': date_stars[date], 'tasks': grouped[date]}
+                for date in sorted_dates
+            ],
+            'next_before': next_before.isoformat() if next_before else None
+        }
+
+    return conditional_json(('history', before, days), user, build)
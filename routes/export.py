@@ -0,0 +1,127 @@
+"""
+Streaming export of a user's task history.
+Rows are read through a server-side cursor in yield_per chunks and written to the
+response as they arrive, so memory stays constant however long the history is.
+"""
+import csv
+import io
+import json
+from datetime import date
+from urllib.parse import quote
+
+from flask import Blueprint, Response, abort, jsonify, redirect, request, session, stream_with_context, url_for
+from werkzeug.utils import secure_filename
+
+from extensions import db
+from models import Task, TaskLog, User
+from routes.home import session_can_access
+
+bp = Blueprint('export', __name__)
+
+EXPORT_COLUMNS = ['date', 'task', 'status', 'time', 'completed_page_numbers', 'frequency', 'duration']
+EXPORT_CHUNK_ROWS = 500  # Rows per yield_per chunk and per response write
+
+def parse_date_range(args):
+    """
+    Reads the optional ?start= and ?end= (inclusive, YYYY-MM-DD) filters.
+    Returns:
+        tuple: (start, end), either may be None.
+    Raises:
+        ValueError: If a date is malformed.
+    """
+    dates = []
+    for name in ('start', 'end'):
+        value = args.get(name)
+        dates.append(date.fromisoformat(value) if value else None)
+    return tuple(dates)
+
+def iter_history_rows(user_id, start=None, end=None):
+    """
+    Yields a user's logs in date order as dicts with the task's frequency and duration.
+    Parameters:
+        user_id (int): The ID of the user.
+        start (date): First date to include, or None.
+        end (date): Last date to include, or None.
+    """
+    # Current task name; logs of deleted tasks keep the name they were logged under
+    query = (db.select(TaskLog.date, db.func.coalesce(Task.task, TaskLog.task).label('task'), TaskLog.status,
+                       TaskLog.time, TaskLog.completed_page_numbers, Task.frequency, Task.duration)
+             .outerjoin(Task, Task.id == TaskLog.task_id)
+             .where(TaskLog.user_id == user_id)
+             .order_by(TaskLog.date, TaskLog.id))
+    if start:
+        query = query.where(TaskLog.date >= start)
+    if end:
+        query = query.where(TaskLog.date <= end)
+
+    for row in db.session.execute(query, execution_options={"yield_per": EXPORT_CHUNK_ROWS}):
+        record = {column: getattr(row, column) for column in EXPORT_COLUMNS}
+        record['date'] = row.date.isoformat()
+        record['time'] = row.time.strftime("%H:%M:%S") if row.time else None
+        yield record
+
+def generate_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def generate_jsonl(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row) + "\n")
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines)
+
+def attachment_header(filename, ascii_filename):
+    """
+    Builds a Content-Disposition value for any user name: the ASCII name as filename= for
+    every client, plus the exact name as RFC 5987 filename*= when the two differ.
+    Parameters:
+        filename (str): The name the download should get.
+        ascii_filename (str): Plain ASCII name without quotes, e.g. from secure_filename.
+    Returns:
+        str: The header value.
+    """
+    if filename == ascii_filename:
+        return f'attachment; filename="{ascii_filename}"'
+    return f'attachment; filename="{ascii_filename}"; filename*=UTF-8\'\'{quote(filename)}'
+
+EXPORT_FORMATS = {
+    'csv': (generate_csv, 'text/csv'),
+    'jsonl': (generate_jsonl, 'application/x-ndjson')
+}
+
+@bp.route('/export/<int:user_id>.<fmt>')
+def export_history(user_id, fmt):
+    """Download a user's task history as CSV or JSON lines, optionally limited with ?start= and ?end="""
+    if 'user_id' not in session:
+        return redirect(url_for('home.home'))
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    user = User.query.get(user_id)
+    if not user:
+        abort(404)
+    if not session_can_access(user):
+        abort(403)
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    generate, mimetype = EXPORT_FORMATS[fmt]
+    filename = f"{user.name}-task-history.{fmt}".replace(' ', '_')
+    ascii_filename = f"{secure_filename(user.name) or f'user-{user.id}'}-task-history.{fmt}"
+    return Response(
+        stream_with_context(generate(iter_history_rows(user_id, start, end))),
+        mimetype=mimetype,
+        headers={'Content-Disposition': attachment_header(filename, ascii_filename)}
+    )
@@ -1,100 +1,175 @@
-from flask import Blueprint, render_template, session, redirect, url_for
+from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify
 from models import TaskLog, User, Task
-from datetime import datetime
+from datetime import date as Date
 from collections import defaultdict
-from timezone_utils import get_pst_weekday
+from extensions import db
+from page_cache import cached_page, page_key
+from summaries import get_daily_summaries
+from schedule import tasks_due_by_weekday
+from timezone_utils import date_weekdays
 
 bp = Blueprint('history', __name__)
 
-@bp.route('/history')
-def history():
-    if 'user_id' not in session:
-        return redirect(url_for('home.home'))
+DEFAULT_HISTORY_DAYS = 30
+MAX_HISTORY_DAYS = 366
 
-    user_id = session['user_id']
-    user = User.query.get(user_id)
-    if not user:
-        return redirect(url_for('home.home'))
+def parse_history_window(args):
+    """
+    Reads the pagination cursor from request arguments.
+    Parameters:
+        args (MultiDict): Request arguments with optional 'before' (YYYY-MM-DD) and 'days'.
+    Returns:
+        tuple: (before, days) where before is a date, or None for the newest page.
+    """
+    before = args.get('before')
+    if before:
+        try:
+            before = Date.fromisoformat(before)
+        except ValueError:
+            before = None
+    days = args.get('days', DEFAULT_HISTORY_DAYS, type=int) or DEFAULT_HISTORY_DAYS
+    return before, max(1, min(MAX_HISTORY_DAYS, days))
 
-    # Query task logs for the user
-    task_logs = TaskLog.query.filter_by(user_id=user_id).all()
+def load_history_page(user_id, before=None, days=DEFAULT_HISTORY_DAYS):
+    """
+    Loads one page of a user's task history: the latest `days` dates with logs before the cursor.
+    Parameters:
+        user_id (int): The ID of the user.
+        before (date): Only dates strictly before this one are returned; None for the newest page.
+        days (int): Maximum number of dates on the page.
+    Returns:
+        tuple: (grouped, sorted_dates, date_stars, next_before) where next_before is the cursor
+            for the following page, or None when there are no older dates.
+    """
+    # Distinct log dates, newest first, read from the (user_id, date, task_id) index
+    date_query = db.session.query(TaskLog.date).filter(TaskLog.user_id == user_id)
+    if before:
+        date_query = date_query.filter(TaskLog.date < before)
+    sorted_dates = [row.date for row in date_query.distinct().order_by(TaskLog.date.desc()).limit(days + 1)]
+    next_before = None
+    if len(sorted_dates) > days:
+        sorted_dates = sorted_dates[:days]
+        next_before = sorted_dates[-1]
+    if not sorted_dates:
+        return {}, [], {}, None
+
+    # Only the logs inside the requested date window, joined to their tasks by id
+    task_logs = (db.session.query(TaskLog, Task)
+                 .outerjoin(Task, Task.id == TaskLog.task_id)
+                 .filter(TaskLog.user_id == user_id,
+                         TaskLog.date >= sorted_dates[-1],
+                         TaskLog.date <= sorted_dates[0])
+                 .all())
 
     # Fetch all tasks for the user from the database
-    all_tasks = Task.query.filter_by(user_id=user.id).all()
+    all_tasks = Task.query.filter_by(user_id=user_id).all()
 
     # Group by date, ordered by date desc
     grouped = defaultdict(list)
-    
-    # Create a lookup for task details
-    task_details = {task.task: {'frequency': task.frequency, 'duration': task.duration} for task in all_tasks}
-    
-    for log in task_logs:
-        task_info = task_details.get(log.task, {'frequency': 'Unknown', 'duration': None})
+
+    for log, task in task_logs:
+        # Logs of deleted tasks keep the name they were logged under
         grouped[log.date].append({
-            "task": log.task,
+            "task_id": log.task_id,
+            "task": task.task if task else log.task,
             "status": log.status,
-            "time": log.time,
+            "time": log.time_str,
             "completed_page_numbers": log.completed_page_numbers,
-            "frequency": task_info['frequency'],
-            "duration": task_info['duration']
+            "frequency": task.frequency if task else 'Unknown',
+            "duration": task.duration if task else None
         })
-    sorted_dates = sorted(grouped.keys(), reverse=True)
+
+    # Star ratings come from the materialized daily summaries where available
+    summaries = get_daily_summaries(user_id, sorted_dates)
 
     # Calculate star status for each date
     date_stars = {}
-    # Filter tasks based on frequency for each date
-    today_weekday = get_pst_weekday()
+    # Tasks due on each weekday, compiled once for the whole page
+    due_by_weekday = tasks_due_by_weekday(all_tasks)
+    weekday_of = date_weekdays(grouped.keys())
     for date, tasks in grouped.items():
-        tasks_with_status = {task['task']: task for task in tasks}
-        for task in all_tasks:
-            # Check if the task should be shown on this date based on its frequency
-            if task.frequency.lower() == "daily" or today_weekday in [day.strip().capitalize() for day in task.frequency.split(",")]:
-                if task.task not in tasks_with_status:
-                    tasks.append({
-                        "task": task.task, 
-                        "status": "TODO", 
-                        "time": None, 
-                        "completed_page_numbers": None,
-                        "frequency": task.frequency,
-                        "duration": task.duration
-                    })
+        logged_task_ids = {task['task_id'] for task in tasks}
+        # Add a TODO row for every task due on this date's weekday that has no log
+        for task in due_by_weekday[weekday_of[date]]:
+            if task.id not in logged_task_ids:
+                tasks.append({
+                    "task_id": task.id,
+                    "task": task.task,
+                    "status": "TODO",
+                    "time": None,
+                    "completed_page_numbers": None,
+                    "frequency": task.frequency,
+                    "duration": task.duration
+                })
 
         # Sort tasks: completed tasks first (ordered by completion time), then TODO tasks
         def sort_tasks(task):
             if task['status'] == 'Done' and task['time']:
-                # For completed tasks, sort by completion time (earliest first)
-                try:
-                    return (0, datetime.strptime(task['time'], "%H:%M:%S"))
-                except:
-                    return (0, datetime.min)  # If time parsing fails, put at beginning
+                # For completed tasks, sort by completion time (earliest first); HH:MM:SS sorts in time order
+                return (0, task['time'])
             elif task['status'] == 'Done':
                 # Completed tasks without time go after timed completed tasks
-                return (1, datetime.min)
+                return (1, '')
             else:
                 # TODO tasks go to the bottom, sorted alphabetically by task name
                 return (2, task['task'])
-        
+
         tasks.sort(key=sort_tasks)
 
+        if date in summaries:
+            date_stars[date] = summaries[date].stars
+            continue
+
+        # No summary row yet (e.g. before `flask backfill-summaries` ran), derive it from the logs
         all_done = all(task['status'] == 'Done' for task in tasks)
         all_done_before_noon = False
         if all_done:
-            try:
-                # Extract times and check if all are before noon
-                times = [task['time'] for task in tasks if task['time']]
-                if times:
-                    latest_time = max(datetime.strptime(time, "%H:%M:%S") for time in times)
-                    if latest_time.hour < 12:  # Check if the latest time is before noon
-                        all_done_before_noon = True
-            except Exception as e:
-                print(f"Error calculating stars for date {date}: {e}")
-                all_done_before_noon = False
+            # Check if the latest completion time is before noon
+            times = [task['time'] for task in tasks if task['time']]
+            all_done_before_noon = bool(times) and max(times) < "12:00:00"
         date_stars[date] = 2 if all_done_before_noon else (1 if all_done else 0)
 
-    return render_template(
-        'history.html',
-        user=user.name,
-        grouped=grouped,
-        sorted_dates=sorted_dates,
-        date_stars=date_stars
-    )
+    return grouped, sorted_dates, date_stars, next_before
+
+@bp.route('/history')
+def history():
+    if 'user_id' not in session:
+        return redirect(url_for('home.home'))
+
+    user_id = session['user_id']
+    user = User.query.get(user_id)
+    if not user:
+        return redirect(url_for('home.home'))
+
+    before, days = parse_history_window(request.args)
+
+    def render_page():
+        grouped, sorted_dates, date_stars, next_before = load_history_page(user_id, before, days)
+        return render_template(
+            'history.html',
+            user=user.name,
+            grouped=grouped,
+            sorted_dates=sorted_dates,
+            date_stars=date_stars,
+            next_before=next_before,
+            days=days
+        )
+
+    return cached_page('history', page_key('history', [user], before, days), render_page)
+
+@bp.route('/history.json')
+def history_json():
+    """Return one page of history as JSON so the page can load older dates while scrolling"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    before, days = parse_history_window(request.args)
+    grouped, sorted_dates, date_stars, next_before = load_history_page(session['user_id'], before, days)
+
+    return jsonify({
+        'dates': [
+            {'date': date.isoformat(), 'stars': date_stars[date], 'tasks': grouped[date]}
+            for date in sorted_dates
+        ],
+        'next_before': next_before.isoformat() if next_before else None
+    })
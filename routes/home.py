@@ -3,6 +3,22 @@ from models import User
 
 bp = Blueprint('home', __name__)
 
+def session_can_access(user):
+    """
+    Checks whether the logged-in user may see and change another user's data.
+    Parameters:
+        user (User): The user whose data is asked for.
+    Returns:
+        bool: True for the logged-in user themselves or a child of the same parent.
+    """
+    viewer_id = session.get('user_id')
+    if viewer_id is None:
+        return False
+    if viewer_id == user.id:
+        return True
+    viewer = User.query.get(viewer_id)
+    return viewer is not None and viewer.parent_id == user.parent_id
+
 @bp.route('/', methods=['GET', 'POST'])
 def home():
     if request.method == 'POST':
@@ -0,0 +1,53 @@
+import json
+import time
+
+from flask import Blueprint, Response, current_app, jsonify, request, session
+
+from events import get_event_broker, user_channel
+from models import User
+from routes.home import session_can_access
+
+bp = Blueprint('live', __name__)
+
+@bp.route('/events')
+def events():
+    """
+    Server-sent events stream of task status changes for the logged-in user,
+    or for ?user_id= when a parent watches one of the children of the same parent.
+    The stream ends after EVENTS_MAX_STREAM_SECONDS so it does not hold a server thread
+    for as long as the tab stays open, and the browser reconnects after the retry delay.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    user_id = request.args.get('user_id', session['user_id'], type=int)
+    if user_id != session['user_id']:
+        watched = User.query.get(user_id)
+        if not watched:
+            return jsonify({'error': 'User not found'}), 404
+        if not session_can_access(watched):
+            return jsonify({'error': 'Not allowed to watch this user'}), 403
+
+    subscription = get_event_broker().subscribe(user_channel(user_id))
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT', 15)
+    ends_at = time.monotonic() + current_app.config.get('EVENTS_MAX_STREAM_SECONDS', 300)
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if event is None:
+                    # Comment line keeps proxies from closing the idle connection and detects gone clients
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Let nginx pass events through unbuffered
+    })
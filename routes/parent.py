@@ -1,6 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for
+from datetime import date
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify
+from sqlalchemy.exc import IntegrityError
 from models import User, Task, Parent
 from extensions import db
+from bulk_tasks import apply_task_changes, copy_tasks
+from page_cache import bump_data_version, cached_page, page_key
 
 bp = Blueprint('parent', __name__)
 
@@ -18,6 +22,11 @@ def validate_user_data(name, dob):
     
     if not dob or dob.strip() == '':
         return 'Date of birth is required'
+
+    try:
+        date.fromisoformat(dob.strip())
+    except ValueError:
+        return 'Date of birth must be YYYY-MM-DD'
     
     return None
 
@@ -39,46 +48,28 @@ def parent():
         # Default to the first user in the dropdown if no user_id is provided
         selected_user_id = users[0].id
 
-    selected_user = User.query.get(selected_user_id) if selected_user_id else None
-    user_tasks = Task.query.filter_by(user_id=selected_user_id).all() if selected_user_id else []
 
     if request.method == 'POST':
         action = request.form.get('action')
         user_id = request.form.get('user_id')
         
-        if action == 'edit':
-            old_task = request.form.get('old_task')
-            new_task = request.form.get('new_task')
-            frequency = request.form.get('frequency')
-            duration = request.form.get('duration')
-            log_page_numbers = request.form.get('log_completed_page_numbers') == 'on'
-            task = Task.query.filter_by(user_id=user_id, task=old_task).first()
-            if task:
-                task.task = new_task
-                task.frequency = frequency
-                task.duration = int(duration) if duration else None
-                task.log_completed_page_numbers = log_page_numbers
-                db.session.commit()
-
-        elif action == 'delete':
-            old_task = request.form.get('old_task')
-            task = Task.query.filter_by(user_id=user_id, task=old_task).first()
-            if task:
-                db.session.delete(task)
+        if action in ('edit', 'delete', 'add'):
+            # Single-row forms go through the same path as the bulk endpoint
+            if action == 'add':
+                change = {'op': 'add', 'task': request.form.get('task')}
+            else:
+                change = {'op': action, 'task': request.form.get('old_task'), 'new_task': request.form.get('new_task')}
+            if action != 'delete':
+                change['frequency'] = request.form.get('frequency')
+                change['duration'] = request.form.get('duration')
+                change['log_completed_page_numbers'] = request.form.get('log_completed_page_numbers') == 'on'
+            try:
+                apply_task_changes(user_id, [change])
                 db.session.commit()
+            except ValueError as e:
+                db.session.rollback()
+                return redirect(url_for('parent.parent', user_id=user_id, error=str(e)))
 
-        elif action == 'add':
-            new_task = request.form.get('task')
-            frequency = request.form.get('frequency')
-            duration = request.form.get('duration')
-            log_page_numbers = request.form.get('log_completed_page_numbers') == 'on'
-            if new_task and frequency:
-                task = Task(user_id=user_id, task=new_task, frequency=frequency, 
-                           duration=int(duration) if duration else None,
-                           log_completed_page_numbers=log_page_numbers)
-                db.session.add(task)
-                db.session.commit()
-        
         elif action == 'edit_user':
             user_id = request.form.get('edit_user_id')
             name = request.form.get('user_name')
@@ -93,10 +84,11 @@ def parent():
                 user = User.query.get(user_id)
                 if user:
                     user.name = name
-                    user.dob = dob
+                    user.dob = date.fromisoformat(dob.strip())
                     # Ensure AI difficulty is between 1-20, default to 10
                     difficulty = int(ai_difficulty) if ai_difficulty else 10
                     user.ai_difficulty = max(1, min(20, difficulty))
+                    bump_data_version([user.id])
                     db.session.commit()
                     return redirect(url_for('parent.parent', user_id=selected_user_id))
             else:
@@ -119,7 +111,7 @@ def parent():
                 difficulty = int(ai_difficulty) if ai_difficulty else 10
                 # Ensure AI difficulty is between 1-20
                 difficulty = max(1, min(20, difficulty))
-                new_user = User(name=name, dob=dob, ai_difficulty=difficulty, parent_id=parent_obj.id)
+                new_user = User(name=name, dob=date.fromisoformat(dob.strip()), ai_difficulty=difficulty, parent_id=parent_obj.id)
                 db.session.add(new_user)
                 db.session.commit()
                 return redirect(url_for('parent.parent', user_id=selected_user_id))
@@ -129,38 +121,77 @@ def parent():
                 return redirect(url_for('parent.parent', user_id=selected_user_id, error=error_msg))
         
         elif action == 'copy_tasks':
-            target_user_id = request.form.get('target_user_id')
             source_user_id = request.form.get('source_user_id')
-            
-            if target_user_id and source_user_id and target_user_id != source_user_id:
-                # Get tasks from source user
-                source_tasks = Task.query.filter_by(user_id=source_user_id).all()
-                
-                # Get existing tasks for target user to avoid duplicates
-                existing_tasks = Task.query.filter_by(user_id=target_user_id).all()
-                existing_task_names = {task.task for task in existing_tasks}
-                
-                # Copy tasks that don't already exist
-                for task in source_tasks:
-                    if task.task not in existing_task_names:
-                        new_task = Task(
-                            user_id=target_user_id,
-                            task=task.task,
-                            frequency=task.frequency,
-                            duration=task.duration,
-                            log_completed_page_numbers=task.log_completed_page_numbers
-                        )
-                        db.session.add(new_task)
-                
+            # Either one target (copy into the selected user) or several checked targets
+            target_user_ids = request.form.getlist('target_user_ids') or [request.form.get('target_user_id')]
+            target_user_ids = [target for target in target_user_ids if target]
+
+            if source_user_id and target_user_ids:
+                # A stale form can name users that are gone; check before the insert trips the foreign key
+                try:
+                    source_user_id = int(source_user_id)
+                    target_user_ids = [int(target) for target in target_user_ids]
+                except ValueError:
+                    return redirect(url_for('parent.parent', user_id=selected_user_id, error='Invalid user selected'))
+                user_ids = {source_user_id, *target_user_ids}
+                known = set(db.session.scalars(db.select(User.id).where(User.id.in_(user_ids))))
+                if known != user_ids:
+                    return redirect(url_for('parent.parent', user_id=selected_user_id, error='User not found'))
+
+                copy_tasks(source_user_id, target_user_ids)
                 db.session.commit()
-                return redirect(url_for('parent.parent', user_id=target_user_id))
+                return redirect(url_for('parent.parent', user_id=target_user_ids[0] if len(target_user_ids) == 1 else source_user_id))
 
         return redirect(url_for('parent.parent', user_id=user_id))
 
-    return render_template(
-        'parent.html',
-        users=users,
-        selected_user=selected_user,
-        user_tasks=user_tasks,
-        error_message=error_message
-    )
+    def render_page():
+        selected_user = User.query.get(selected_user_id) if selected_user_id else None
+        user_tasks = Task.query.filter_by(user_id=selected_user_id).all() if selected_user_id else []
+        return render_template(
+            'parent.html',
+            users=users,
+            selected_user=selected_user,
+            user_tasks=user_tasks,
+            error_message=error_message
+        )
+
+    # The key covers the data versions of the listed users, which must include the selected one
+    if str(selected_user_id) not in {str(user.id) for user in users}:
+        return render_page()
+    return cached_page('parent', page_key('parent', users, str(selected_user_id), error_message), render_page)
+
+@bp.route('/parent/tasks/bulk', methods=['POST'])
+def bulk_tasks():
+    """
+    Applies many task changes in one transaction.
+    Body: {"users": {"<user_id>": [{"op": "add" | "edit" | "delete", "task": ..., ...}, ...]},
+           "copy": {"source_user_id": ..., "target_user_ids": [...]}}; both keys are optional.
+    """
+    data = request.get_json(silent=True) or {}
+    result = {'copied': 0, 'users': {}}
+    try:
+        copy = data.get('copy')
+        changes_by_user = data.get('users') or {}
+        if not isinstance(changes_by_user, dict):
+            raise TypeError("users must map user ids to lists of changes")
+        if copy and not (isinstance(copy, dict) and isinstance(copy.get('target_user_ids', []), list)):
+            raise TypeError("copy must be an object with source_user_id and a target_user_ids list")
+
+        # Unknown ids would only fail on the foreign keys halfway through the writes
+        user_ids = {int(user_id) for user_id in changes_by_user}
+        if copy:
+            user_ids.add(int(copy['source_user_id']))
+            user_ids.update(int(user_id) for user_id in copy.get('target_user_ids', []))
+        unknown = user_ids - set(db.session.scalars(db.select(User.id).where(User.id.in_(user_ids))))
+        if unknown:
+            return jsonify({'error': f"Unknown user ids: {', '.join(map(str, sorted(unknown)))}"}), 404
+
+        if copy:
+            result['copied'] = copy_tasks(copy['source_user_id'], copy.get('target_user_ids', []))
+        for user_id, changes in changes_by_user.items():
+            result['users'][user_id] = apply_task_changes(user_id, changes)
+        db.session.commit()
+    except (KeyError, TypeError, ValueError, IntegrityError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e.orig) if isinstance(e, IntegrityError) else str(e)}), 400
+    return jsonify(result)
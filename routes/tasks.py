@@ -1,38 +1,48 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from models import User, Task, TaskLog
+from models import User, Task, TaskLog, utcnow
 from openai_helper import fetch_ai_problems, get_user_difficulty, update_user_difficulty
-from datetime import datetime
-from extensions import db
-from timezone_utils import now_pst, format_pst_date, format_pst_time, format_pst_datetime, get_pst_weekday
+from extensions import db, UPSERT_INSERTS
+from schedule import date_weekday
+from summaries import refresh_daily_summary
+from problem_generator import get_problem_generator
+from events import get_event_broker, user_channel
+from page_cache import bump_data_version, cached_page, page_key
+from timezone_utils import current_clock, format_pst_date, format_pst_datetime
 
 bp = Blueprint('tasks', __name__)
 
-def load_tasks_for_user(user_id):
+def load_tasks_for_user(user_id, date=None):
     """
     Loads tasks for a specific user and updates their statuses based on the log file for the current date.
     Parameters:
         user_id (int): The ID of the user.
+        date (date): The date to load; today (Pacific) by default.
     Returns:
         list: A list of tasks with their statuses and completion times.
     """
-    today = now_pst()
-    today_str = format_pst_date(today)
-    today_weekday = get_pst_weekday(today)  # Get the current weekday (e.g., Mon, Tue)
-
-    tasks = Task.query.filter_by(user_id=user_id).all()
-    task_logs = TaskLog.query.filter_by(user_id=user_id, date=today_str).all()
+    day = date or current_clock().today
+    today_bit = 1 << date_weekday(day)  # Bit of the date's weekday in the schedule masks
+
+    # One outer join of the user's tasks to the day's logs on the (user_id, date, task_id) index
+    rows = (db.session.query(Task, TaskLog)
+            .outerjoin(TaskLog, db.and_(TaskLog.user_id == Task.user_id,
+                                        TaskLog.date == day,
+                                        TaskLog.task_id == Task.id))
+            .filter(Task.user_id == user_id)
+            .order_by(Task.id)
+            .all())
 
     task_list = []
-    for task in tasks:
+    for task, log in rows:
         # Check if the task should be shown today based on its frequency
-        if task.frequency.lower() == "daily" or today_weekday in [day.strip().capitalize() for day in task.frequency.split(",")]:
-            log = next((log for log in task_logs if log.task == task.task), None)
+        if task.schedule.mask & today_bit:
             task_list.append({
+                "id": task.id,
                 "task": task.task,
                 "status": log.status if log else "TODO",
                 "frequency": task.frequency,
                 "duration": task.duration if task.duration is not None else "as needed",  # Show 'as needed' for empty durations
-                "time": log.time if log and log.status == "Done" else None,
+                "time": log.time_str if log and log.status == "Done" else None,
                 "log_completed_page_numbers": task.log_completed_page_numbers  # Add this field
             })
     return task_list
@@ -42,24 +52,69 @@ def log_task_status(user_id, task, status, page_numbers=None):
     Logs the status of a task for a specific user in the task log table.
     Parameters:
         user_id (int): The ID of the user.
-        task (str): The name of the task (e.g., "AI Problems").
+        task (Task): The task being logged.
         status (str): The new status of the task (e.g., "Done" or "TODO").
         page_numbers (str): The page numbers completed (optional).
+    Returns:
+        TaskLog: The created or updated log entry.
     """
-    today = format_pst_date()
-    time = format_pst_time() if status == "Done" else None
-
-    log = TaskLog.query.filter_by(user_id=user_id, task=task, date=today).first()
+    clock = current_clock()
+    today = clock.today
+    time = clock.time_of_day if status == "Done" else None
+
+    values = {"user_id": user_id, "task_id": task.id, "task": task.task, "date": today,
+              "status": status, "time": time, "updated_at": utcnow()}
+    if page_numbers is not None:
+        values["completed_page_numbers"] = page_numbers
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in UPSERT_INSERTS:
+        # Single INSERT ... ON CONFLICT DO UPDATE on the unique (user_id, date, task_id) index;
+        # the name is refreshed too in case the task was renamed since the first log of the day
+        stmt = UPSERT_INSERTS[dialect](TaskLog).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date', 'task_id'],
+            set_={key: stmt.excluded[key] for key in values if key not in ('user_id', 'task_id', 'date')}
+        ).returning(TaskLog)
+        log = db.session.scalars(stmt, execution_options={"populate_existing": True}).one()
+        refresh_daily_summary(user_id, today)
+        bump_data_version([user_id])
+        db.session.commit()
+        publish_task_status(log)
+        return log
+
+    log = TaskLog.query.filter_by(user_id=user_id, task_id=task.id, date=today).first()
     if log:
+        log.task = task.task
         log.status = status
         log.time = time
         if page_numbers is not None:
             log.completed_page_numbers = page_numbers
     else:
-        log = TaskLog(user_id=user_id, task=task, date=today, status=status, time=time, completed_page_numbers=page_numbers)
+        log = TaskLog(user_id=user_id, task_id=task.id, task=task.task, date=today, status=status, time=time,
+                      completed_page_numbers=page_numbers)
         db.session.add(log)
     
+    refresh_daily_summary(user_id, today)
+    bump_data_version([user_id])
     db.session.commit()
+    publish_task_status(log)
+    return log
+
+def publish_task_status(log):
+    """
+    Pushes a committed status change to the user's open pages on every device.
+    Parameters:
+        log (TaskLog): The updated log entry.
+    """
+    get_event_broker().publish(user_channel(log.user_id), {
+        "type": "task_status",
+        "task": log.task,
+        "date": log.date.isoformat(),
+        "status": log.status,
+        "time": log.time_str if log.status == "Done" else None,
+        "completed_page_numbers": log.completed_page_numbers
+    })
 
 def check_all_done_before_noon(tasks):
     """
@@ -69,14 +124,31 @@ def check_all_done_before_noon(tasks):
     Returns:
         bool: True if all tasks are completed before noon, False otherwise.
     """
-    try:
-        times = [task['time'] for task in tasks if task['time']]
-        if times:
-            latest_time = max(datetime.strptime(time, "%H:%M:%S") for time in times)
-            return latest_time.hour < 12
-    except Exception as e:
-        print(f"Error checking completion times: {e}")
-    return False
+    # Completion times are zero-padded HH:MM:SS, so they compare in time order
+    times = [task['time'] for task in tasks if task['time']]
+    return bool(times) and max(times) < "12:00:00"
+
+def render_tasks_page(user, tasks):
+    """
+    Renders the task page of a user.
+    Parameters:
+        user (User): The user.
+        tasks (list): The day's tasks from load_tasks_for_user.
+    Returns:
+        str: The rendered page.
+    """
+    all_done = all(task['status'] == 'Done' for task in tasks)
+    all_done_before_noon = check_all_done_before_noon(tasks)
+
+    today = format_pst_datetime()
+
+    return render_template(
+        'tasks.html',
+        user=user.name,
+        tasks=tasks,
+        today=today,
+        today_date=format_pst_date(),
+    )
 
 @bp.route('/tasks', methods=['GET', 'POST'])
 def tasks():
@@ -88,70 +160,61 @@ def tasks():
     if not user:
         return redirect(url_for('home.home'))
 
+    if request.method == 'GET':
+        # Unchanged since the last view today: served without loading the tasks
+        return cached_page('tasks', page_key('tasks', [user]),
+                           lambda: render_tasks_page(user, load_tasks_for_user(user_id)))
+
     tasks = load_tasks_for_user(user_id)
 
     # Initialize difficulty before handling POST requests
     difficulty = get_user_difficulty(user.name)
 
-    if request.method == 'POST':
-        action = request.form.get('action')
-        task_idx = request.form.get('task_idx')
-        if task_idx is not None:
-            task_idx = int(task_idx)
-            task_to_update = tasks[task_idx]
-            if action == 'mark':
-                # Check if this task requires page numbers
-                if task_to_update['log_completed_page_numbers']:
-                    # For tasks that need page numbers, we'll handle this via JavaScript
-                    # The form submission will be intercepted by JavaScript
-                    # But if we somehow get here, redirect back to avoid confusion
-                    return redirect(url_for('tasks.tasks'))
-                else:
-                    # For normal tasks, mark as done immediately
-                    log_task_status(user_id, task_to_update['task'], 'Done')
-            elif action == 'unmark':
-                log_task_status(user_id, task_to_update['task'], 'TODO', '')
-            
-            # Always reload tasks after any status change
-            tasks = load_tasks_for_user(user_id)
-
-        difficulty_action = request.form.get('difficulty_action')
-        refresh_questions = request.form.get('refresh_questions')
-
-        if difficulty_action:
-            if difficulty_action == 'increase':
-                if difficulty >= 20:
-                    flash("Already at max level, dude!", "warning")
-                else:
-                    print(f"Current difficulty before increase: {difficulty}")
-                    new_difficulty = min(difficulty + 1, 20)  # Updated max difficulty to 20
-                    update_user_difficulty(user.name, new_difficulty)
-                    print(f"New difficulty after increase: {new_difficulty}")
-            elif difficulty_action == 'decrease':
-                print(f"Current difficulty before decrease: {difficulty}")
-                new_difficulty = max(difficulty - 1, 1)  # Assuming min difficulty is 1
+    action = request.form.get('action')
+    task_idx = request.form.get('task_idx')
+    if task_idx is not None:
+        task_idx = int(task_idx)
+        task_to_update = tasks[task_idx]
+        task = db.session.get(Task, task_to_update['id'])  # Already loaded by load_tasks_for_user
+        if action == 'mark':
+            # Check if this task requires page numbers
+            if task_to_update['log_completed_page_numbers']:
+                # For tasks that need page numbers, we'll handle this via JavaScript
+                # The form submission will be intercepted by JavaScript
+                # But if we somehow get here, redirect back to avoid confusion
+                return redirect(url_for('tasks.tasks'))
+            else:
+                # For normal tasks, mark as done immediately
+                log = log_task_status(user_id, task, 'Done')
+                task_to_update['status'] = log.status
+                task_to_update['time'] = log.time_str
+        elif action == 'unmark':
+            log = log_task_status(user_id, task, 'TODO', '')
+            task_to_update['status'] = log.status
+            task_to_update['time'] = None
+
+    difficulty_action = request.form.get('difficulty_action')
+    refresh_questions = request.form.get('refresh_questions')
+
+    if difficulty_action:
+        if difficulty_action == 'increase':
+            if difficulty >= 20:
+                flash("Already at max level, dude!", "warning")
+            else:
+                new_difficulty = min(difficulty + 1, 20)  # Updated max difficulty to 20
                 update_user_difficulty(user.name, new_difficulty)
-                print(f"New difficulty after decrease: {new_difficulty}")
-
-            # Refresh difficulty after update
-            difficulty = get_user_difficulty(user.name)
+        elif difficulty_action == 'decrease':
+            new_difficulty = max(difficulty - 1, 1)  # Assuming min difficulty is 1
+            update_user_difficulty(user.name, new_difficulty)
 
-        # Handle refresh questions
-        force_refresh = refresh_questions == 'true' if refresh_questions else False
-    else:
-        force_refresh = False
+        # Refresh difficulty after update and start generating the set for the new level
+        difficulty = get_user_difficulty(user.name)
+        get_problem_generator().request(user.name, difficulty)
 
-    all_done = all(task['status'] == 'Done' for task in tasks)
-    all_done_before_noon = check_all_done_before_noon(tasks)
+    # Handle refresh questions
+    force_refresh = refresh_questions == 'true' if refresh_questions else False
 
-    today = format_pst_datetime()
-
-    return render_template(
-        'tasks.html',
-        user=user.name,
-        tasks=tasks,
-        today=today,
-    )
+    return render_tasks_page(user, tasks)
 
 @bp.route('/submit_page_numbers', methods=['POST'])
 def submit_page_numbers():
@@ -165,8 +228,12 @@ def submit_page_numbers():
     
     if not task_name:
         return jsonify({'success': False, 'error': 'Task name is required'}), 400
+
+    task = Task.query.filter_by(user_id=user_id, task=task_name).order_by(Task.id).first()
+    if not task:
+        return jsonify({'success': False, 'error': 'Task not found'}), 404
     
-    # Log the task as done with page numbers
-    log_task_status(user_id, task_name, 'Done', page_numbers)
-    
-    return jsonify({'success': True})
+    # Log the task as done with page numbers; other devices get it through the event stream
+    log = log_task_status(user_id, task, 'Done', page_numbers)
+
+    return jsonify({'success': True, 'log': {'task': log.task, 'status': log.status, 'time': log.time_str}})
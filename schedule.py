@@ -0,0 +1,79 @@
+"""
+Weekday schedules for tasks.
+A task's frequency is either "daily" or a comma-separated list of weekday
+abbreviations ("Mon, Wed, Fri"). It is compiled once into a Schedule holding a
+7-bit mask, so checking whether a task is due on a date is a single bit test.
+"""
+from datetime import date
+from functools import lru_cache
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEKDAY_BITS = {day: 1 << i for i, day in enumerate(WEEKDAYS)}
+ALL_DAYS = (1 << len(WEEKDAYS)) - 1
+
+@lru_cache(maxsize=1024)
+def frequency_mask(frequency):
+    """
+    Parses a frequency string into a weekday bitmask.
+    Parameters:
+        frequency (str): "daily" or weekday abbreviations separated by commas.
+    Returns:
+        int: Bitmask with bit i set when the task is due on WEEKDAYS[i].
+    """
+    if frequency.lower() == "daily":
+        return ALL_DAYS
+    mask = 0
+    for day in frequency.split(","):
+        mask |= WEEKDAY_BITS.get(day.strip().capitalize(), 0)
+    return mask
+
+@lru_cache(maxsize=4096)
+def date_weekday(day):
+    """
+    Returns the weekday index (0 = Mon) of a date or a "YYYY-MM-DD" date string.
+    """
+    return (date.fromisoformat(day) if isinstance(day, str) else day).weekday()
+
+class Schedule:
+    """
+    Compiled weekday schedule of a task frequency. Use compile_schedule() to get the shared instance.
+    """
+    __slots__ = ('frequency', 'mask')
+
+    def __init__(self, frequency):
+        self.frequency = frequency
+        self.mask = frequency_mask(frequency)
+
+    def is_due_on_weekday(self, weekday_index):
+        """
+        Checks whether the task is due on a weekday index (0 = Mon).
+        """
+        return bool(self.mask >> weekday_index & 1)
+
+    def is_due(self, day):
+        """
+        Checks whether the task is due on a date, given as date/datetime or "YYYY-MM-DD".
+        """
+        weekday_index = date_weekday(day) if isinstance(day, str) else day.weekday()
+        return self.is_due_on_weekday(weekday_index)
+
+    def __repr__(self):
+        return f"Schedule({self.frequency!r}, mask={self.mask:07b})"
+
+compile_schedule = lru_cache(maxsize=1024)(Schedule)
+
+def tasks_due_by_weekday(tasks):
+    """
+    Buckets tasks by the weekdays they are due on.
+    Parameters:
+        tasks (list): Task rows.
+    Returns:
+        list: Seven lists, index 0 = Mon, each holding the tasks due on that weekday.
+    """
+    buckets = [[] for _ in WEEKDAYS]
+    for task in tasks:
+        mask = task.schedule.mask
+        for weekday_index in range(len(WEEKDAYS)):
+            if mask >> weekday_index & 1:
+                buckets[weekday_index].append(task)
+    return buckets
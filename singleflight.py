@@ -0,0 +1,173 @@
+"""
+Single-flight deduplication of expensive calls.
+Concurrent callers with the same key wait for one in-flight call and share its
+result. FileLockSingleFlight additionally serializes callers across processes on
+one host (e.g. several gunicorn workers) with an flock'ed file per key.
+Groups also answer whether a key is running and remember keys whose last call
+failed, so any process can report the state of work another one is doing.
+"""
+import hashlib
+import os
+import threading
+
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, fall back to in-process deduplication
+    fcntl = None
+
+LOCK_DIR = os.path.join(os.path.dirname(__file__), 'data', 'locks')
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls across the threads of one process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._failed = set()
+
+    def do(self, key, fn, recheck=None):
+        """
+        Runs fn() unless a call with the same key is already in flight, in which case its result is returned.
+        Parameters:
+            key (hashable): Identifies the work, e.g. (user, difficulty, date).
+            fn (callable): Produces the result.
+            recheck (callable): Optional; called by the leader before fn() and its result used if not None.
+        Returns:
+            The result of fn() or recheck(), shared by all callers of the flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, recheck)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run(self, key, fn, recheck):
+        if recheck is not None:
+            result = recheck()
+            if result is not None:
+                return result
+        return fn()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def running(self, key):
+        """
+        Returns True while a call with the key is in flight, in this process or, for groups
+        that coordinate processes, in another one.
+        """
+        return self.in_flight(key)
+
+    def mark_failed(self, key):
+        """
+        Records that the last call for the key did not produce a usable result.
+        """
+        with self._lock:
+            self._failed.add(key)
+
+    def clear_failed(self, key):
+        with self._lock:
+            self._failed.discard(key)
+
+    def failed(self, key):
+        with self._lock:
+            return key in self._failed
+
+class FileLockSingleFlight(SingleFlight):
+    """
+    Deduplicates in-process like SingleFlight, and makes the leader take an exclusive
+    flock on a per-key lock file so only one process on the host runs fn() at a time.
+    Processes that waited on the lock use recheck() to pick up what the holder produced.
+    A held lock tells other processes the key is running, and a failure is recorded as a
+    .failed file next to the lock file.
+    """
+    def __init__(self, lock_dir=LOCK_DIR):
+        super().__init__()
+        self.lock_dir = lock_dir
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _key_path(self, key, suffix):
+        return os.path.join(self.lock_dir, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + suffix)
+
+    def _lock_path(self, key):
+        return self._key_path(key, '.lock')
+
+    def _run(self, key, fn, recheck):
+        with open(self._lock_path(key), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return super()._run(key, fn, recheck)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def running(self, key):
+        if super().running(key):
+            return True
+        try:
+            fd = os.open(self._lock_path(key), os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            # A shared lock is refused only while a leader holds the exclusive one
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    def mark_failed(self, key):
+        open(self._key_path(key, '.failed'), 'w').close()
+
+    def clear_failed(self, key):
+        try:
+            os.unlink(self._key_path(key, '.failed'))
+        except FileNotFoundError:
+            pass
+
+    def failed(self, key):
+        return os.path.exists(self._key_path(key, '.failed'))
+
+def init_app(app):
+    """
+    Creates the single-flight group selected by AI_SINGLE_FLIGHT: "file" (default) or "thread".
+    """
+    mode = app.config.get('AI_SINGLE_FLIGHT', 'file')
+    if mode == 'file' and fcntl is not None:
+        group = FileLockSingleFlight(app.config.get('AI_SINGLE_FLIGHT_LOCK_DIR', LOCK_DIR))
+    else:
+        group = SingleFlight()
+    app.extensions['single_flight'] = group
+
+def get_single_flight():
+    """
+    Returns the single-flight group of the current app.
+    """
+    return current_app.extensions['single_flight']
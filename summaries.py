@@ -0,0 +1,139 @@
+"""
+Materialized per-day summaries of task completion.
+log_task_status keeps the daily_summaries row of the changed day up to date, so
+history, streaks and dashboards read one row per day instead of re-deriving star
+ratings from every log. `flask backfill-summaries` rebuilds the rows from task_logs.
+"""
+from extensions import db, UPSERT_INSERTS
+from models import DailySummary, Task, TaskLog
+from page_cache import bump_data_version
+from schedule import date_weekday
+from timezone_utils import is_before_noon_pst
+
+def summarize_day(date, tasks, logs):
+    """
+    Computes the summary of one day from the user's tasks and that day's logs.
+    Tasks due on the date without a log count as not done, as on the history page.
+    Parameters:
+        date (date): The date.
+        tasks (list): The user's Task rows.
+        logs (list): The user's TaskLog rows for the date.
+    Returns:
+        dict: tasks_due, tasks_done, latest_completion and stars.
+    """
+    weekday_index = date_weekday(date)
+    logged_task_ids = {log.task_id for log in logs}
+    missing = sum(1 for task in tasks if task.id not in logged_task_ids and task.schedule.is_due_on_weekday(weekday_index))
+
+    tasks_due = len(logs) + missing
+    tasks_done = sum(1 for log in logs if log.status == 'Done')
+    times = [log.time for log in logs if log.time]
+    latest_completion = max(times) if times else None
+
+    all_done = tasks_done == tasks_due
+    all_done_before_noon = all_done and latest_completion is not None and is_before_noon_pst(latest_completion)
+    return {
+        "tasks_due": tasks_due,
+        "tasks_done": tasks_done,
+        "latest_completion": latest_completion,
+        "stars": 2 if all_done_before_noon else (1 if all_done else 0)
+    }
+
+def save_daily_summaries(user_id, summaries):
+    """
+    Inserts or updates summary rows without committing.
+    Parameters:
+        user_id (int): The ID of the user.
+        summaries (dict): Maps dates to summarize_day() results.
+    """
+    rows = [dict(summary, user_id=user_id, date=date) for date, summary in summaries.items()]
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in UPSERT_INSERTS:
+        stmt = UPSERT_INSERTS[dialect](DailySummary)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_={key: stmt.excluded[key] for key in ('tasks_due', 'tasks_done', 'latest_completion', 'stars')}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    existing = {summary.date: summary for summary in DailySummary.query.filter(
+        DailySummary.user_id == user_id, DailySummary.date.in_(summaries.keys()))}
+    for row in rows:
+        summary = existing.get(row['date'])
+        if summary:
+            for key, value in row.items():
+                setattr(summary, key, value)
+        else:
+            db.session.add(DailySummary(**row))
+
+def refresh_daily_summary(user_id, date):
+    """
+    Recomputes the summary of one day after a change, without committing.
+    Days without logs have no summary row.
+    Parameters:
+        user_id (int): The ID of the user.
+        date (date): The date.
+    Returns:
+        dict: The new summary, or None if the day has no logs.
+    """
+    logs = TaskLog.query.filter_by(user_id=user_id, date=date).all()
+    if not logs:
+        DailySummary.query.filter_by(user_id=user_id, date=date).delete()
+        return None
+    tasks = Task.query.filter_by(user_id=user_id).all()
+    summary = summarize_day(date, tasks, logs)
+    save_daily_summaries(user_id, {date: summary})
+    return summary
+
+def get_daily_summaries(user_id, dates):
+    """
+    Reads the stored summaries for a set of dates.
+    Returns:
+        dict: Maps each date that has a summary row to the DailySummary.
+    """
+    if not dates:
+        return {}
+    return {summary.date: summary for summary in DailySummary.query.filter(
+        DailySummary.user_id == user_id, DailySummary.date.in_(list(dates)))}
+
+def backfill_daily_summaries(user_ids, batch_size=500):
+    """
+    Rebuilds the summaries of the given users from their task_logs.
+    Logs are streamed in date order so memory stays bounded by one day plus one batch.
+    Parameters:
+        user_ids (list): IDs of the users to rebuild.
+        batch_size (int): Number of summary rows written per statement.
+    Returns:
+        int: Number of summary rows written.
+    """
+    written = 0
+    for user_id in user_ids:
+        tasks = Task.query.filter_by(user_id=user_id).all()
+        DailySummary.query.filter_by(user_id=user_id).delete()
+
+        batch = {}
+        current_date, day_logs = None, []
+        logs = db.session.scalars(
+            db.select(TaskLog).filter_by(user_id=user_id).order_by(TaskLog.date, TaskLog.id),
+            execution_options={"yield_per": 1000}
+        )
+        for log in logs:
+            if log.date != current_date:
+                if day_logs:
+                    batch[current_date] = summarize_day(current_date, tasks, day_logs)
+                current_date, day_logs = log.date, []
+                if len(batch) >= batch_size:
+                    save_daily_summaries(user_id, batch)
+                    written += len(batch)
+                    batch = {}
+            day_logs.append(log)
+        if day_logs:
+            batch[current_date] = summarize_day(current_date, tasks, day_logs)
+        save_daily_summaries(user_id, batch)
+        written += len(batch)
+        bump_data_version([user_id])
+        db.session.commit()
+    return written
@@ -1,12 +1,35 @@
 """
 Timezone utilities for handling PST/PDT timezone conversions
-Uses pytz for reliable timezone handling in production environments
+Uses pytz for reliable timezone handling in production environments, or the
+stdlib zoneinfo when TIMEZONE_BACKEND=zoneinfo (also used when pytz is missing).
+Inside a request the helpers read one ClockSnapshot taken on first use, so all of
+a request's dates, times and weekdays agree even across midnight.
 """
-from datetime import datetime
-import pytz
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from flask import g, has_request_context
+
+try:
+    import pytz
+except ImportError:  # zoneinfo covers the same zone
+    pytz = None
+
+TIMEZONE_BACKEND = os.environ.get('TIMEZONE_BACKEND', 'pytz') if pytz is not None else 'zoneinfo'
 
 # US/Pacific timezone automatically handles PST/PDT transitions
-PACIFIC_TZ = pytz.timezone('US/Pacific')
+if TIMEZONE_BACKEND == 'zoneinfo':
+    from zoneinfo import ZoneInfo
+    PACIFIC_TZ = ZoneInfo('America/Los_Angeles')
+    UTC = timezone.utc
+
+    def localize(naive_dt):
+        """Attach the Pacific zone to a naive Pacific wall-clock time."""
+        return naive_dt.replace(tzinfo=PACIFIC_TZ)
+else:
+    PACIFIC_TZ = pytz.timezone('US/Pacific')
+    UTC = pytz.utc
+    localize = PACIFIC_TZ.localize
 
 def get_pacific_timezone():
     """
@@ -20,12 +43,43 @@ def now_pst():
     """
     return datetime.now(PACIFIC_TZ)
 
+class ClockSnapshot:
+    """
+    One reading of the Pacific clock with the strings and values the app derives from it.
+    """
+    __slots__ = ('now', 'date', 'time', 'today', 'time_of_day', 'weekday', 'weekday_index', 'display')
+
+    def __init__(self, now=None):
+        self.now = now or now_pst()
+        self.date = self.now.strftime("%Y-%m-%d")
+        self.time = self.now.strftime("%H:%M:%S")
+        self.today = self.now.date()
+        self.time_of_day = self.now.time().replace(microsecond=0)  # As stored in TaskLog.time
+        self.weekday = self.now.strftime("%a")
+        self.weekday_index = self.now.weekday()
+        self.display = self.now.strftime("%A, %B %d, %Y")
+
+    def __repr__(self):
+        return f"ClockSnapshot({self.date} {self.time})"
+
+def current_clock():
+    """
+    Get the clock snapshot of the current request, taken on first use.
+    Outside a request (background threads, CLI commands) a fresh snapshot is returned.
+    """
+    if not has_request_context():
+        return ClockSnapshot()
+    clock = g.get('pst_clock')
+    if clock is None:
+        clock = g.pst_clock = ClockSnapshot()
+    return clock
+
 def utc_to_pst(utc_dt):
     """
     Convert UTC datetime to Pacific timezone (PST/PDT).
     """
     if utc_dt.tzinfo is None:
-        utc_dt = pytz.utc.localize(utc_dt)
+        utc_dt = utc_dt.replace(tzinfo=UTC)
     return utc_dt.astimezone(PACIFIC_TZ)
 
 def pst_to_utc(pst_dt):
@@ -33,8 +87,8 @@ def pst_to_utc(pst_dt):
     Convert Pacific timezone datetime to UTC.
     """
     if pst_dt.tzinfo is None:
-        pst_dt = PACIFIC_TZ.localize(pst_dt)
-    return pst_dt.astimezone(pytz.utc)
+        pst_dt = localize(pst_dt)
+    return pst_dt.astimezone(UTC)
 
 def format_pst_date(dt=None, format_str="%Y-%m-%d"):
     """
@@ -42,10 +96,11 @@ def format_pst_date(dt=None, format_str="%Y-%m-%d"):
     If no datetime is provided, uses current Pacific time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        clock = current_clock()
+        return clock.date if format_str == "%Y-%m-%d" else clock.now.strftime(format_str)
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
-        dt = pytz.utc.localize(dt).astimezone(PACIFIC_TZ)
+        dt = dt.replace(tzinfo=UTC).astimezone(PACIFIC_TZ)
     elif dt.tzinfo != PACIFIC_TZ:
         dt = dt.astimezone(PACIFIC_TZ)
     return dt.strftime(format_str)
@@ -56,10 +111,11 @@ def format_pst_time(dt=None, format_str="%H:%M:%S"):
     If no datetime is provided, uses current Pacific time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        clock = current_clock()
+        return clock.time if format_str == "%H:%M:%S" else clock.now.strftime(format_str)
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
-        dt = pytz.utc.localize(dt).astimezone(PACIFIC_TZ)
+        dt = dt.replace(tzinfo=UTC).astimezone(PACIFIC_TZ)
     elif dt.tzinfo != PACIFIC_TZ:
         dt = dt.astimezone(PACIFIC_TZ)
     return dt.strftime(format_str)
@@ -70,10 +126,11 @@ def format_pst_datetime(dt=None, format_str="%A, %B %d, %Y"):
     If no datetime is provided, uses current Pacific time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        clock = current_clock()
+        return clock.display if format_str == "%A, %B %d, %Y" else clock.now.strftime(format_str)
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
-        dt = pytz.utc.localize(dt).astimezone(PACIFIC_TZ)
+        dt = dt.replace(tzinfo=UTC).astimezone(PACIFIC_TZ)
     elif dt.tzinfo != PACIFIC_TZ:
         dt = dt.astimezone(PACIFIC_TZ)
     return dt.strftime(format_str)
@@ -84,20 +141,38 @@ def get_pst_weekday(dt=None):
     If no datetime is provided, uses current Pacific time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        return current_clock().weekday
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
-        dt = pytz.utc.localize(dt).astimezone(PACIFIC_TZ)
+        dt = dt.replace(tzinfo=UTC).astimezone(PACIFIC_TZ)
     elif dt.tzinfo != PACIFIC_TZ:
         dt = dt.astimezone(PACIFIC_TZ)
     return dt.strftime("%a")
 
-def is_before_noon_pst(time_str):
+def next_pst_midnight(date_str=None):
+    """
+    Get the Pacific midnight that ends the given PST date ("YYYY-MM-DD").
+    If no date is provided, uses the current Pacific date.
+    """
+    if date_str is None:
+        date_str = format_pst_date()
+    day = datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)
+    return localize(day)
+
+def is_before_noon_pst(value):
+    """
+    Check if a Pacific time of day (a time, or an HH:MM:SS string) is before noon.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, "%H:%M:%S").time()
+        except ValueError:
+            return False
+    return value.hour < 12
+
+def date_weekdays(dates):
     """
-    Check if a time string (HH:MM:SS format) represents a time before noon in PST.
+    Get the weekday index (0 = Mon) of many dates (date objects or "YYYY-MM-DD" strings) at once.
+    Returns a dict keyed by each distinct date.
     """
-    try:
-        time_obj = datetime.strptime(time_str, "%H:%M:%S").time()
-        return time_obj.hour < 12
-    except ValueError:
-        return False
+    return {day: (date.fromisoformat(day) if isinstance(day, str) else day).weekday() for day in set(dates)}
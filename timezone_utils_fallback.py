@@ -1,21 +1,24 @@
 """
 Alternative timezone utilities that work without pytz dependency
 Uses built-in datetime with manual DST calculation
+Mirrors timezone_utils, including the per-request ClockSnapshot and the batch helpers.
 """
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+
+from flask import g, has_request_context
 
 # PST is UTC-8, PDT is UTC-7
 PST = timezone(timedelta(hours=-8))
 PDT = timezone(timedelta(hours=-7))
 
-def get_pst_timezone():
+def get_pst_timezone(utc_dt=None):
     """
     Get the appropriate PST/PDT timezone based on daylight saving time.
-    Returns PST (UTC-8) or PDT (UTC-7) depending on the current date.
+    Returns PST (UTC-8) or PDT (UTC-7) depending on the given aware UTC datetime, or the current date.
     """
     # Simple daylight saving time check for US Pacific timezone
     # DST typically runs from second Sunday in March to first Sunday in November
-    now_utc = datetime.now(timezone.utc)
+    now_utc = utc_dt or datetime.now(timezone.utc)
     year = now_utc.year
     
     # Calculate DST start (second Sunday in March)
@@ -43,6 +46,37 @@ def now_pst():
     """
     return datetime.now(get_pst_timezone())
 
+class ClockSnapshot:
+    """
+    One reading of the PST clock with the strings and values the app derives from it.
+    """
+    __slots__ = ('now', 'date', 'time', 'today', 'time_of_day', 'weekday', 'weekday_index', 'display')
+
+    def __init__(self, now=None):
+        self.now = now or now_pst()
+        self.date = self.now.strftime("%Y-%m-%d")
+        self.time = self.now.strftime("%H:%M:%S")
+        self.today = self.now.date()
+        self.time_of_day = self.now.time().replace(microsecond=0)  # As stored in TaskLog.time
+        self.weekday = self.now.strftime("%a")
+        self.weekday_index = self.now.weekday()
+        self.display = self.now.strftime("%A, %B %d, %Y")
+
+    def __repr__(self):
+        return f"ClockSnapshot({self.date} {self.time})"
+
+def current_clock():
+    """
+    Get the clock snapshot of the current request, taken on first use.
+    Outside a request a fresh snapshot is returned.
+    """
+    if not has_request_context():
+        return ClockSnapshot()
+    clock = g.get('pst_clock')
+    if clock is None:
+        clock = g.pst_clock = ClockSnapshot()
+    return clock
+
 def utc_to_pst(utc_dt):
     """
     Convert UTC datetime to PST/PDT.
@@ -65,8 +99,9 @@ def format_pst_date(dt=None, format_str="%Y-%m-%d"):
     If no datetime is provided, uses current PST time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        clock = current_clock()
+        return clock.date if format_str == "%Y-%m-%d" else clock.now.strftime(format_str)
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
         dt = dt.replace(tzinfo=timezone.utc).astimezone(get_pst_timezone())
     return dt.strftime(format_str)
@@ -77,8 +112,9 @@ def format_pst_time(dt=None, format_str="%H:%M:%S"):
     If no datetime is provided, uses current PST time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        clock = current_clock()
+        return clock.time if format_str == "%H:%M:%S" else clock.now.strftime(format_str)
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
         dt = dt.replace(tzinfo=timezone.utc).astimezone(get_pst_timezone())
     return dt.strftime(format_str)
@@ -89,8 +125,9 @@ def format_pst_datetime(dt=None, format_str="%A, %B %d, %Y"):
     If no datetime is provided, uses current PST time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        clock = current_clock()
+        return clock.display if format_str == "%A, %B %d, %Y" else clock.now.strftime(format_str)
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
         dt = dt.replace(tzinfo=timezone.utc).astimezone(get_pst_timezone())
     return dt.strftime(format_str)
@@ -101,18 +138,37 @@ def get_pst_weekday(dt=None):
     If no datetime is provided, uses current PST time.
     """
     if dt is None:
-        dt = now_pst()
-    elif dt.tzinfo is None:
+        return current_clock().weekday
+    if dt.tzinfo is None:
         # Assume UTC if no timezone info
         dt = dt.replace(tzinfo=timezone.utc).astimezone(get_pst_timezone())
     return dt.strftime("%a")
 
-def is_before_noon_pst(time_str):
+def next_pst_midnight(date_str=None):
+    """
+    Get the PST/PDT midnight that ends the given PST date ("YYYY-MM-DD").
+    If no date is provided, uses the current PST date.
+    """
+    if date_str is None:
+        date_str = format_pst_date()
+    day = datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)
+    # The offset in effect at that midnight, which is not today's on the days DST changes
+    return day.replace(tzinfo=get_pst_timezone((day + timedelta(hours=8)).replace(tzinfo=timezone.utc)))
+
+def is_before_noon_pst(value):
+    """
+    Check if a PST time of day (a time, or an HH:MM:SS string) is before noon.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, "%H:%M:%S").time()
+        except ValueError:
+            return False
+    return value.hour < 12
+
+def date_weekdays(dates):
     """
-    Check if a time string (HH:MM:SS format) represents a time before noon in PST.
+    Get the weekday index (0 = Mon) of many dates (date objects or "YYYY-MM-DD" strings) at once.
+    Returns a dict keyed by each distinct date.
     """
-    try:
-        time_obj = datetime.strptime(time_str, "%H:%M:%S").time()
-        return time_obj.hour < 12
-    except ValueError:
-        return False
+    return {day: (date.fromisoformat(day) if isinstance(day, str) else day).weekday() for day in set(dates)}
@@ -0,0 +1,30 @@
+"""
+WSGI entry point for production servers: `gunicorn wsgi:app` picks up the worker,
+thread, keep-alive and preload settings from gunicorn.conf.py.
+With preload the app is created once in the gunicorn master and shared by the
+forked workers; gunicorn.conf.py calls after_fork() in each of them.
+"""
+import app_logging
+import database
+import events
+import openai_helper
+from app import create_app
+from instrumentation import METRICS
+
+app = create_app()
+
+def after_fork():
+    """
+    Gives a worker forked from the preloaded app its own process resources. The generation pool
+    and the event relay's receive thread start on first use, so the master has none to lose in
+    the fork; its log writer thread did not survive it, and sockets and pooled connections would
+    be shared with the master. The worker restarts its log writer, takes a fresh relay and
+    generator state, and opens its own database connections and OpenAI client. Its metrics
+    start empty rather than with copies of the master's boot queries.
+    """
+    app_logging.start_logging(app)
+    database.dispose_engines(app)
+    openai_helper.reset_client()
+    events.restart_relay(app)
+    app.extensions['problem_generator'].after_fork()
+    METRICS.clear()